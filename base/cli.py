@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import argparse
 import asyncio
 import logging
 import os
+import sys
 
 import yaml
 
-from .core import config, client
+from .core import config, client, database, migrations
+from .utils import simulator, verifier
 
 
 async def async_main(configuration) -> None:
@@ -18,7 +21,25 @@ async def async_main(configuration) -> None:
         await bot.close()
 
 
-def main():
+async def async_migrate(configuration, check_only: bool) -> int:
+    conn = await database.connect(configuration.postgres)
+    try:
+        if check_only:
+            await migrations.check(conn)
+        else:
+            applied = await migrations.migrate(conn)
+            logging.info("Applied %s migrations", len(applied))
+            await migrations.check(conn)
+    except RuntimeError as ex:
+        logging.error("%s", ex)
+        return 1
+    finally:
+        await conn.close()
+
+    return 0
+
+
+def load_config() -> config.Config:
     config_path = os.getenv("PYGEAR_CONFIG_FILE", "../config.yaml")
 
     with open(config_path) as fp:
@@ -33,6 +54,12 @@ def main():
     # Mute aiohttp server for health checking
     logging.getLogger("aiohttp.access").setLevel(logging.ERROR)
 
+    return configuration
+
+
+def run(_args) -> None:
+    configuration = load_config()
+
     try:
         import uvloop
 
@@ -42,3 +69,23 @@ def main():
         logging.info("Not using uvloop for asyncio event loop native implementation")
 
     asyncio.run(async_main(configuration))
+
+
+def migrate(args) -> int:
+    return asyncio.run(async_migrate(load_config(), args.check))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="base", description="Runs the bot, or one of its offline tools.")
+    parser.set_defaults(func=run)
+    subparsers = parser.add_subparsers(title="commands")
+
+    migrate_parser = subparsers.add_parser("migrate", help="apply pending schema migrations")
+    migrate_parser.add_argument("--check", action="store_true", help="only check the database is fully migrated")
+    migrate_parser.set_defaults(func=migrate)
+
+    verifier.add_arguments(subparsers.add_parser("verify", help="recompute and check provably fair rolls in bulk"))
+    simulator.add_arguments(subparsers.add_parser("simulate", help="simulate games to check their RTP and house edge"))
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Changes to members' token balances.
+
+Every operation is a single statement that returns the updated currency row, so nothing needs reading back after it.
+Changes made during a game are also queued for the ledger.
+
+Rows are cached in memory, most recently used first, and every write we make refreshes the cache. A trigger on
+``currency`` notifies every process of each change, so rows changed elsewhere, including by hand through ``db do``, are
+dropped from the cache. The cache is only used while we are listening for those notifications.
+"""
+import asyncio
+import collections
+import logging
+import typing
+
+import asyncpg
+
+CACHE_SIZE = 10_000
+CHANNEL = "currency"
+RELISTEN_DELAY = 5
+
+
+class Balance:
+    def __init__(self, bot, cache_size: int = CACHE_SIZE):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        # user_id -> currency row, or None for members without one, least recently used first.
+        self._cache = collections.OrderedDict()
+        # Bumped on every invalidation, so a read that raced one doesn't cache what it read.
+        self._generation = 0
+        self._listener: typing.Optional[asyncpg.Connection] = None
+        self._watcher: typing.Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def generation(self) -> int:
+        """Bumped on every invalidation. Read it before a write and pass it to ``remember`` with the result."""
+        return self._generation
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def listen(self, config) -> None:
+        """Opens a connection of our own to listen for changes on, and starts caching."""
+        await self._connect(config)
+        self._watcher = self.bot.loop.create_task(self._watch(config))
+        self.logger.info("Listening for currency changes, caching up to %s balances", self.cache_size)
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self._listener is not None:
+            await self._listener.close()
+
+    async def get(self, user_id: int) -> typing.Optional[asyncpg.Record]:
+        if user_id in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(user_id)
+            return self._cache[user_id]
+
+        self.misses += 1
+        generation = self._generation
+        row = await self.bot.statements.fetchrow("get_member", user_id)
+        if generation == self._generation:
+            self._store(user_id, row)
+        return row
+
+    async def debit(self, user_id: int, amount: int) -> typing.Optional[asyncpg.Record]:
+        """Takes tokens from a member, returning None if they don't have enough."""
+        generation = self._generation
+        row = self.remember(await self.bot.statements.fetchrow("debit_currency", user_id, amount), generation)
+        if row is not None:
+            await self.bot.ledger.record(user_id, amount, "debit")
+        return row
+
+    async def credit(self, user_id: int, amount: int) -> asyncpg.Record:
+        generation = self._generation
+        row = self.remember(await self.bot.statements.fetchrow("credit_currency", user_id, amount), generation)
+        await self.bot.ledger.record(user_id, amount, "credit")
+        return row
+
+    async def change_seed(self, user_id: int, seed: str) -> asyncpg.Record:
+        generation = self._generation
+        return self.remember(await self.bot.statements.fetchrow("change_seed", user_id, seed), generation)
+
+    async def settle(self, payouts: typing.Dict[int, float]) -> typing.Dict[int, asyncpg.Record]:
+        """
+        Credits every winner of a game, and the house's commission, in one statement, so either everyone is paid or
+        nobody is. Amounts are rounded to whole tokens, and the updated rows are returned by user_id.
+        """
+        payouts = {user_id: round(amount) for user_id, amount in payouts.items()}
+        if not payouts:
+            return {}
+
+        generation = self._generation
+        rows = await self.bot.statements.fetch("settle_currency", list(payouts), list(payouts.values()))
+        rows = {row["user_id"]: self.remember(row, generation) for row in rows}
+        for user_id, amount in payouts.items():
+            await self.bot.ledger.record(user_id, amount, "credit")
+        self.bot.metrics.inc("games_settled_total", game=self.bot.ledger.current_game() or "none")
+        return rows
+
+    def remember(self, row: typing.Optional[asyncpg.Record], generation: int) -> typing.Optional[asyncpg.Record]:
+        """
+        Caches a currency row returned by a write, unless something was invalidated since ``generation`` was read
+        before making it. The listener runs on its own connection, so another process's change to the same member can
+        be handled before our write returns, and the row it returned would then be stale with nothing left to drop it.
+        """
+        if row is not None and generation == self._generation:
+            self._store(row["user_id"], row)
+        return row
+
+    def forget(self, user_id: int) -> None:
+        """Drops a member's cached row, after a write outside of this class that didn't return it."""
+        self._generation += 1
+        self._cache.pop(user_id, None)
+
+    def _store(self, user_id: int, row: typing.Optional[asyncpg.Record]) -> None:
+        if self._listener is None:
+            return
+
+        self._cache[user_id] = row
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _on_notification(self, _connection, _pid, _channel, payload: str) -> None:
+        user_id, *change = payload.split(":", 2)
+        user_id = int(user_id)
+        row = self._cache.get(user_id)
+
+        # Our own writes notify us too, and the cache already holds what they returned.
+        if change and row is not None and [str(row["tokens"]), row["seed"]] == change:
+            return
+
+        self.forget(user_id)
+
+    async def _connect(self, config) -> None:
+        listener = await asyncpg.connect(**config.connection_dict())
+        await listener.add_listener(CHANNEL, self._on_notification)
+        self._listener = listener
+
+    async def _watch(self, config) -> None:
+        """Stops caching while the listener is disconnected, since we could miss changes, and reconnects it."""
+        while not self._closing:
+            await asyncio.sleep(RELISTEN_DELAY)
+            if self._listener is not None:
+                if not self._listener.is_closed():
+                    continue
+
+                self.logger.warning("Lost the currency listener, balances won't be cached until it reconnects")
+                self._listener = None
+                self._generation += 1
+                self._cache.clear()
+
+            try:
+                await self._connect(config)
+            except (OSError, asyncpg.PostgresError) as ex:
+                self.logger.warning("Couldn't reconnect the currency listener: %s", ex)
+            else:
+                self.logger.info("Reconnected the currency listener")
@@ -19,8 +19,13 @@ class BaseCog(commands.Cog):
         return self.bot.database
 
     @property
-    def sql_cache(self):
-        return self.bot.sql_cache
+    def balances(self):
+        # Not "balance", which BettorCog's !balance command would shadow.
+        return self.bot.balance
+
+    @property
+    def statements(self):
+        return self.bot.statements
 
     @property
     def config(self):
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import asyncio
 import datetime
 import logging
 import time
@@ -8,11 +7,27 @@ import traceback
 import typing
 
 import asyncpg
+import discord
 from discord.ext import commands
 
 import base
-from base.utils.provably_fair import update_seed
-from . import config, database
+from base.utils.premade_messages import overloaded_message
+from . import (
+    balance,
+    config,
+    database,
+    ledger,
+    log_sender,
+    loop_monitor,
+    metrics,
+    nonces,
+    raffles,
+    rest,
+    rooms,
+    router,
+    scheduler,
+    seeds,
+)
 
 
 class Client(commands.Bot):
@@ -23,30 +38,88 @@ class Client(commands.Bot):
     def __init__(self, configuration=config.Config) -> None:
         self.server_seed_hash = str
         self.server_seed = str
-        self.nonce = int
+        self.nonces = nonces.NonceAllocator(self)
+        self.seeds = seeds.SeedManager(self)
         self.open_games = dict()
         self.game_numbers = set()
-        self.raffles = dict()
+        self.raffles = raffles.Raffles(self)
 
         self.started_at = float("nan")
         self.logger = logging.getLogger(__name__)
         self.config = configuration
         self.database: typing.Optional[asyncpg.pool.Pool] = None
-        self.sql_cache = database.SQLCache()
+        self.statements = database.Statements()
+        self.balance = balance.Balance(self)
+        self.ledger = ledger.Ledger(self)
+        self.rest = rest.RestScheduler(self)
+        self.log_sender = log_sender.LogSender(self)
+        self.router = router.Router()
+        self.scheduler = scheduler.Scheduler(self)
+        self.scheduler.register("delete_channel", self._delete_channel)
+        self.scheduler.register("remove_reaction", self._remove_reaction)
+        self.rooms = rooms.RoomPool(self)
         self.command_invoke_count = 0
+        self.metrics = metrics.Metrics(self)
+        self.loop_monitor = loop_monitor.LoopMonitor(self)
         super().__init__(command_prefix=self.config.bot.command_prefix)
+        self._register_metrics()
+        self.before_invoke(self._start_command_timing)
+        self.after_invoke(self._record_command_timing)
 
     @property
     def uptime(self) -> datetime:
         return datetime.timedelta(seconds=time.perf_counter() - self.started_at)
 
+    def _register_metrics(self) -> None:
+        self.metrics.counter("games_started_total", "Games started, once their stake was taken")
+        self.metrics.counter("games_settled_total", "Games paid out")
+        self.metrics.counter("games_refused_total", "Games refused because the event loop was overloaded")
+        self.metrics.histogram(
+            "command_seconds",
+            "Time taken by commands, in total and on Postgres, Discord requests and waiting for players",
+            metrics.COMMAND_SECONDS_BOUNDS,
+        )
+        self.metrics.histogram(
+            "loop_lag_seconds", "How late the event loop woke up for each sample", loop_monitor.LAG_BOUNDS
+        )
+        self.metrics.gauge(
+            "loop_lag_p99_seconds",
+            "Bound of the 99th percentile event loop lag over the recent window",
+            lambda: self.loop_monitor.lag.quantile(0.99),
+        )
+        self.metrics.gauge(
+            "loop_overloaded", "Whether new games are being refused", lambda: self.loop_monitor.overloaded
+        )
+        self.metrics.gauge("db_connections_in_use", "Pooled connections in use", lambda: self.statements.in_use)
+        self.metrics.gauge(
+            "balance_cache_hit_rate", "Balance reads served from the cache", lambda: self.balance.hit_rate
+        )
+        self.metrics.gauge("ledger_queued_rows", "Ledger rows waiting to be written", lambda: self.ledger.depth)
+        self.metrics.gauge("log_queued_embeds", "Log embeds waiting to be posted", lambda: self.log_sender.depth)
+        self.metrics.gauge(
+            "rest_queued_requests",
+            "Requests to Discord waiting to be sent",
+            lambda: sum(map(self.rest.depth, rest.Priority)),
+        )
+        self.metrics.gauge("open_games", "Player games waiting for an opponent", lambda: len(self.open_games))
+
     async def start(self) -> None:
-        self.database = await database.create_connection_pool(self.sql_cache, self.config.postgres)
+        await self.metrics.start()
+        self.loop_monitor.start()
+        self.database = await database.create_connection_pool(self.statements, self.config.postgres)
+        await self.balance.listen(self.config.postgres)
+        self.ledger.start()
+        self.rest.start()
+        self.log_sender.start()
+        await self.raffles.load()
+        await self.scheduler.load()
         self._load_all_extensions()
         self.logger.info("Proceeding with startup of bot")
 
         self.started_at = time.perf_counter()
-        self.loop.create_task(update_seed(self))
+        self.loop.create_task(self.seeds.run())
+        self.rooms.start()
+        self.scheduler.start()
         await self._start()
 
     async def _start(self) -> None:
@@ -55,6 +128,15 @@ class Client(commands.Bot):
     async def close(self) -> None:
         self.logger.info("Closing asyncpg connection")
         try:
+            await self.scheduler.close()
+            await self.seeds.close()
+            await self.rooms.close()
+            await self.ledger.close()
+            await self.log_sender.close()
+            await self.rest.close()
+            await self.metrics.close()
+            await self.loop_monitor.close()
+            await self.balance.close()
             if self.database is not None:
                 await self.database.close()
         finally:
@@ -91,14 +173,48 @@ class Client(commands.Bot):
         await self.get_owner()
 
     async def on_command_error(self, ctx, ex):
-        if isinstance(ex, commands.CommandOnCooldown):
+        if isinstance(ex, loop_monitor.Overloaded):
+            self.metrics.inc("games_refused_total", game=ctx.command.qualified_name)
+            await ctx.send(embed=overloaded_message(ctx))
+        elif isinstance(ex, commands.CommandOnCooldown):
             self.logger.debug("%s is on cool down for %ss", ctx.author, ex.retry_after)
             await ctx.message.add_reaction("\N{SNOWFLAKE}")
-            await asyncio.sleep(ex.retry_after)
-            await ctx.message.remove_reaction("\N{SNOWFLAKE}", self.user)
+            await self.scheduler.schedule(
+                ex.retry_after,
+                "remove_reaction",
+                {"channel_id": ctx.channel.id, "message_id": ctx.message.id, "emoji": "\N{SNOWFLAKE}"},
+            )
         else:
             self.logger.error("".join(traceback.format_exception(type(ex), ex, ex.__traceback__, 4)))
 
+    async def _delete_channel(self, payload: dict) -> None:
+        channel = self.get_channel(payload["channel_id"])
+        if channel is not None:
+            await channel.delete(reason=payload.get("reason"))
+
+    async def _remove_reaction(self, payload: dict) -> None:
+        try:
+            await self.http.remove_own_reaction(payload["channel_id"], payload["message_id"], payload["emoji"])
+        except discord.NotFound:
+            pass
+
+    async def on_message(self, message):
+        self.router.dispatch(message)
+        await self.process_commands(message)
+
+    async def _start_command_timing(self, ctx):
+        metrics.start_timing()
+
+    async def _record_command_timing(self, ctx):
+        timings = metrics.current_timings()
+        if timings is None:
+            return
+
+        command = ctx.command.qualified_name
+        self.metrics.observe("command_seconds", time.perf_counter() - timings.started, command=command, part="total")
+        for part in metrics.PARTS:
+            self.metrics.observe("command_seconds", getattr(timings, part), command=command, part=part)
+
     async def on_command(self, ctx):
         self.command_invoke_count += 1
 
@@ -52,12 +52,103 @@ class PostgresConfig(BaseModel):
     user: str = "postgres"
     database: str = "postgres"
 
+    # Connections the pool opens up front, and the most it will ever have open.
+    min_size: int = 10
+    max_size: int = 10
+
+    # Seconds an idle pooled connection stays open before it is closed, or 0 to keep it open forever.
+    max_inactive_connection_lifetime: float = 300.0
+
+    # Queries asyncpg caches prepared statements for on each connection, on top of the ones we prepare, or 0 for none.
+    statement_cache_size: int = 100
+
+    # Seconds a query may run before it is cancelled, if set.
+    command_timeout: typing.Optional[float] = None
+
+    # Seconds to keep retrying for at startup while Postgres isn't accepting connections yet.
+    connect_deadline: float = 60.0
+
+    def pool_dict(self) -> dict:
+        """Arguments for asyncpg's pool."""
+        return {key: value for key, value in self.to_dict().items() if key != "connect_deadline"}
+
+    def connection_dict(self) -> dict:
+        """Arguments for a single connection, leaving out the ones only a pool takes."""
+        pool_only = ("min_size", "max_size", "max_inactive_connection_lifetime")
+        return {key: value for key, value in self.pool_dict().items() if key not in pool_only}
+
 
 @dataclasses.dataclass(frozen=True)
 class Logging(BaseModel):
     level: str = "INFO"
 
 
+@dataclasses.dataclass(frozen=True)
+class ProvablyFairConfig(BaseModel):
+    # How long a server seed is used before it is revealed and replaced, in seconds.
+    seed_lifetime: int = 12 * 60 * 60
+
+    # If set, server seeds are revealed backwards from a hash chain of this many seeds instead of being random.
+    seed_chain_length: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class LedgerConfig(BaseModel):
+    # How often queued ledger rows are written, in seconds.
+    flush_interval: float = 0.5
+
+    # Queued rows are written straight away once this many are waiting, and at most this many are written at once.
+    flush_size: int = 500
+
+    # Recording a stake or payout waits once this many rows are queued, until some have been written.
+    max_queued: int = 100_000
+
+
+@dataclasses.dataclass(frozen=True)
+class LogsConfig(BaseModel):
+    # How often embeds queued for the rolls_history and archive channels are posted, in seconds.
+    flush_interval: float = 1.0
+
+    # Logging an embed waits once this many are queued, until some have been posted.
+    max_queued: int = 1000
+
+
+@dataclasses.dataclass(frozen=True)
+class RestConfig(BaseModel):
+    # Requests of each priority that may wait to be sent before callers wait for room.
+    max_queued: int = 200
+
+
+@dataclasses.dataclass(frozen=True)
+class LoopConfig(BaseModel):
+    # How often the event loop's lag is sampled, and how many seconds of samples are kept, in seconds.
+    sample_interval: float = 0.1
+    window: float = 10.0
+
+    # New games are refused while most of the window's samples are later than this, in seconds.
+    lag_threshold: float = 0.25
+
+
+@dataclasses.dataclass(frozen=True)
+class MetricsConfig(BaseModel):
+    # Serves /metrics, /healthz and /readyz over HTTP.
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 9100
+
+
+@dataclasses.dataclass(frozen=True)
+class RoomsConfig(BaseModel):
+    # Idle game rooms kept ready under the game_room category.
+    pool_size: int = 10
+
+    # The most game rooms there may be, idle or not. Discord allows 50 channels in a category, and raffles need some.
+    max_rooms: int = 40
+
+    # Seconds a new game waits for a room once all max_rooms are in use, before it's called off and refunded.
+    checkout_timeout: float = 60
+
+
 @dataclasses.dataclass(frozen=True)
 class Flower(BaseModel):
     url: str
@@ -75,3 +166,10 @@ class Config(BaseModel):
     roles: typing.Dict[str, typing.Optional[int]]
     maxes: typing.Dict[int, typing.Optional[int]]
     flowers: typing.Dict[str, typing.Optional[Flower]]
+    provably_fair: ProvablyFairConfig = dataclasses.field(default_factory=ProvablyFairConfig)
+    ledger: LedgerConfig = dataclasses.field(default_factory=LedgerConfig)
+    rooms: RoomsConfig = dataclasses.field(default_factory=RoomsConfig)
+    logs: LogsConfig = dataclasses.field(default_factory=LogsConfig)
+    rest: RestConfig = dataclasses.field(default_factory=RestConfig)
+    metrics: MetricsConfig = dataclasses.field(default_factory=MetricsConfig)
+    loop: LoopConfig = dataclasses.field(default_factory=LoopConfig)
@@ -1,71 +1,164 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Initializes our tables if they do not already exist.
+Checks our schema is up to date, and keeps every statement we run prepared on every connection.
 """
 import asyncio
+import collections
+import contextlib
+import itertools
 import logging
+import os
+import random
+import time
 
 import asyncpg.exceptions
 
-from base.utils import utils
+from base.utils.histogram import Histogram
+from . import metrics, migrations
 
 _LOGGER = logging.getLogger(__name__)
-TOTAL_WARM_UP_RETRIES = 10
-
-
-class SQLCache:
-    def __init__(self):
-        self._cache = {}
-
-    def read(self, file):
-        if file not in self._cache:
-            path = utils.relative_to_here("sql", file)
-            _LOGGER.info("Reading %s", path)
-            with open(path) as fp:
-                self._cache[file] = fp.read()
-
-        return self._cache[file]
-
-
-async def _initialize_schema(cache, conn: asyncpg.Connection) -> None:
-    """Initializes the schema and tables for this database."""
-    # noinspection PyProtectedMember
-    try:
-        _LOGGER.info("Creating initial tables if they don't exist")
-        await conn.execute(cache.read("schema.sql"))
-
-        _LOGGER.info("Initialization completed of database container")
-    except asyncpg.exceptions._base.PostgresError as ex:
-        _LOGGER.critical("Could not initialize database safely", exc_info=ex)
-        raise RuntimeError("Startup failed") from ex
+# Seconds to wait before the first retry while Postgres warms up, doubling up to the maximum after each attempt.
+INITIAL_BACKOFF = 0.1
+MAX_BACKOFF = 5.0
+SQL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+ACQUIRE_WAIT_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+IN_FLIGHT_BOUNDS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Connection(asyncpg.Connection):
+    """A connection that holds every registered statement, prepared by ``Statements.prepare``."""
+
+    prepared: dict
+
+
+class Statements:
+    """
+    Every statement in the sql directory, loaded when the bot starts and prepared on every pooled connection, so
+    running one is just a matter of naming it.
+    """
+
+    def __init__(self, directory: str = SQL_DIRECTORY):
+        self.pool = None
+        self.queries = {}
+        # name -> [calls, total seconds]
+        self.timings = collections.defaultdict(lambda: [0, 0.0])
+        # Connections handed out by acquire, and callers waiting on or holding one.
+        self.in_use = 0
+        self.in_flight = 0
+        # Seconds spent waiting for a connection, and how many callers were in flight, on every acquire.
+        self.acquire_wait = Histogram(ACQUIRE_WAIT_BOUNDS)
+        self.in_flight_histogram = Histogram(IN_FLIGHT_BOUNDS)
+
+        for file in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file)
+            if extension != ".sql":
+                continue
+
+            _LOGGER.info("Reading %s", file)
+            with open(os.path.join(directory, file)) as fp:
+                query = fp.read().strip()
+
+            if not query:
+                raise RuntimeError(f"{file} is empty")
+
+            self.queries[name] = query
+
+    async def prepare(self, conn: Connection) -> None:
+        """Prepares every statement on a new connection. Used as the pool's ``init`` hook."""
+        conn.prepared = {}
+        for name, query in self.queries.items():
+            try:
+                conn.prepared[name] = await conn.prepare(query)
+            except asyncpg.exceptions.PostgresError as ex:
+                raise RuntimeError(f"Could not prepare {name}.sql: {ex}") from ex
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        """Acquires a pooled connection, keeping track of how busy the pool is."""
+        self.in_flight += 1
+        self.in_flight_histogram.observe(self.in_flight)
+        start = time.perf_counter()
+        try:
+            async with self.pool.acquire() as conn:
+                self.acquire_wait.observe(time.perf_counter() - start)
+                self.in_use += 1
+                try:
+                    yield conn
+                finally:
+                    self.in_use -= 1
+        finally:
+            self.in_flight -= 1
+
+    async def _run(self, method: str, name: str, *args):
+        start = time.perf_counter()
+        try:
+            async with self.acquire() as conn:
+                return await getattr(conn.prepared[name], method)(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            timing = self.timings[name]
+            timing[0] += 1
+            timing[1] += elapsed
+            metrics.record("db", elapsed)
+
+    async def execute(self, name: str, *args) -> None:
+        await self._run("fetch", name, *args)
+
+    async def fetch(self, name: str, *args) -> list:
+        return await self._run("fetch", name, *args)
+
+    async def fetchrow(self, name: str, *args):
+        return await self._run("fetchrow", name, *args)
+
+    async def fetchval(self, name: str, *args):
+        return await self._run("fetchval", name, *args)
+
+
+async def connect(config) -> asyncpg.Connection:
+    """
+    Connects to Postgres once it answers a ``SELECT 1``, retrying with jittered exponential backoff until the
+    configured deadline passes.
+    """
+    start = time.perf_counter()
+    deadline = start + config.connect_deadline
+    backoff = INITIAL_BACKOFF
+
+    for attempt in itertools.count(1):
+        try:
+            conn = await asyncpg.connect(**config.connection_dict())
+            try:
+                await conn.fetchval("SELECT 1")
+            except BaseException:
+                await conn.close()
+                raise
+        except (asyncpg.CannotConnectNowError, asyncpg.TooManyConnectionsError, OSError, asyncio.TimeoutError) as ex:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise RuntimeError(f"Postgres is not available after {config.connect_deadline}s!") from ex
+
+            delay = min(backoff * random.uniform(0.5, 1.5), remaining)
+            _LOGGER.info("Database is still warming up, trying again in %.0fms (attempt %s)", delay * 1_000, attempt)
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+        else:
+            waited = time.perf_counter() - start
+            _LOGGER.info("Waited %.2fs for the database to be ready (%s attempts)", waited, attempt)
+            return conn
 
 
-async def create_connection_pool(cache, config):
+async def create_connection_pool(statements, config):
     _LOGGER.info("Initializing asyncpg connection")
 
-    database = None
-
-    for i in range(TOTAL_WARM_UP_RETRIES):
-        try:
-            database = await asyncpg.create_pool(**config.to_dict())
-        except Exception as ex:
-            if isinstance(ex, (asyncpg.CannotConnectNowError, OSError)) and i + 1 < TOTAL_WARM_UP_RETRIES:
-                _LOGGER.info(
-                    "Database is still warming up, will wait for 5 seconds and try again (retry %s/%s)",
-                    i + 1,
-                    TOTAL_WARM_UP_RETRIES,
-                )
-            else:
-                raise RuntimeError("Postgres is not available!")
-
-            await asyncio.sleep(5)
-        else:
-            _LOGGER.info("Connected to postgres successfully: %s", database)
-            break
+    # Ensure tables are up to date before any connection tries to prepare statements against them.
+    conn = await connect(config)
+    try:
+        await migrations.check(conn)
+    finally:
+        await conn.close()
 
-    # Ensure tables are set up.
-    async with database.acquire() as conn:
-        await _initialize_schema(cache, conn)
+    database = await asyncpg.create_pool(**config.pool_dict(), init=statements.prepare, connection_class=Connection)
+    statements.pool = database
+    _LOGGER.info("Connected to postgres successfully and prepared %s statements: %s", len(statements.queries), database)
 
     return database
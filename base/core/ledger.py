@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+An append-only record of every token staked on and paid out of a game.
+
+Each game runs inside a single command, so ``start_round`` keeps the game being played, and the nonces rolled for it,
+in a context variable. While a round is running, every change ``Balance`` makes is queued as a ledger row. The queue is
+copied into Postgres in the background, either every ``flush_interval`` seconds or as soon as ``flush_size`` rows are
+waiting, so recording a bet doesn't wait on the database. If Postgres can't keep up and ``max_queued`` rows are waiting,
+recording waits for room in the queue rather than letting it grow without bound.
+"""
+import asyncio
+import collections
+import contextvars
+import dataclasses
+import datetime
+import logging
+import typing
+
+COLUMNS = ("user_id", "game", "amount", "direction", "server_seed_id", "nonce_start", "nonce_end", "created_at")
+
+
+@dataclasses.dataclass
+class Round:
+    game: str
+    # user_id -> [server seed id, first nonce, last nonce] rolled by that user this round.
+    nonces: dict = dataclasses.field(default_factory=dict)
+
+
+_round: contextvars.ContextVar = contextvars.ContextVar("ledger_round", default=None)
+
+
+class Ledger:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self._queue = collections.deque()
+        self._full = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def settings(self):
+        return self.bot.config.ledger
+
+    @property
+    def depth(self) -> int:
+        """Rows waiting to be written."""
+        return len(self._queue)
+
+    @staticmethod
+    def start_round(game: str) -> None:
+        """Starts recording a game for the rest of the current command."""
+        _round.set(Round(game))
+
+    @staticmethod
+    def current_game() -> typing.Optional[str]:
+        """The game being played in the current command, if any."""
+        current = _round.get()
+        return current.game if current is not None else None
+
+    @staticmethod
+    def rolled(user_id: int, server_seed_id: int, nonce_start: int, nonce_end: int) -> None:
+        """Notes nonces rolled for a user this round. A round that spans a seed rotation keeps the latest seed's."""
+        current = _round.get()
+        if current is None:
+            return
+
+        nonces = current.nonces.get(user_id)
+        if nonces is None or nonces[0] != server_seed_id:
+            current.nonces[user_id] = [server_seed_id, nonce_start, nonce_end]
+        else:
+            nonces[1], nonces[2] = min(nonces[1], nonce_start), max(nonces[2], nonce_end)
+
+    async def record(self, user_id: int, amount: int, direction: str) -> None:
+        """Queues a row for a change to a user's balance, if it happened during a game."""
+        current = _round.get()
+        if current is None:
+            return
+
+        if len(self._queue) >= self.settings.max_queued:
+            self.logger.critical("%s ledger rows are waiting to be written, holding up games", len(self._queue))
+            async with self._space:
+                await self._space.wait_for(lambda: len(self._queue) < self.settings.max_queued)
+
+        # Hosts don't roll, so their rows point at the rolls that decided the round when only one player rolled.
+        nonces = current.nonces.get(user_id)
+        if nonces is None and len(current.nonces) == 1:
+            nonces = next(iter(current.nonces.values()))
+        server_seed_id, nonce_start, nonce_end = nonces or (None, None, None)
+
+        self._queue.append(
+            (
+                user_id,
+                current.game,
+                amount,
+                direction,
+                server_seed_id,
+                nonce_start,
+                nonce_end,
+                datetime.datetime.now(datetime.timezone.utc),
+            )
+        )
+        if len(self._queue) >= self.settings.flush_size:
+            self._full.set()
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.settings.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Writes every queued row, leaving them queued for the next flush if Postgres is unavailable."""
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.settings.flush_size))]
+            try:
+                async with self.bot.statements.acquire() as conn:
+                    await conn.copy_records_to_table("ledger", records=batch, columns=COLUMNS)
+            except Exception as ex:
+                self._queue.extendleft(reversed(batch))
+                self.logger.error("Couldn't write %s ledger rows, will retry", len(self._queue), exc_info=ex)
+                return
+
+            async with self._space:
+                self._space.notify_all()
+
+    async def close(self) -> None:
+        """Stops flushing in the background and writes whatever is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        await self.flush()
+        if self._queue:
+            self.logger.critical("Lost %s ledger rows on shutdown", len(self._queue))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Posts to the rolls_history and archive log channels in batches.
+
+Every roll and balance change is logged as an embed, and a game of blackjack or flower poker logs several. Sending
+each one on its own spends a request per embed, in the same rate limit buckets as the games themselves. Instead,
+embeds are queued per channel and posted every ``flush_interval`` seconds, up to ten in a message, which is as many as
+Discord allows. Once ``max_queued`` embeds are waiting, callers wait for room in the queue rather than letting it grow
+without bound while Discord is rate limiting us.
+
+Only rate limits and server errors are retried. Any other error would come back every time, so a rejected batch is
+split until the embeds Discord won't take are found, and those are logged and dropped.
+"""
+import asyncio
+import collections
+import functools
+import logging
+import typing
+
+import discord
+from discord.http import Route
+
+from .rest import Priority
+
+#: Discord's limits on the embeds in a single message.
+EMBEDS_PER_MESSAGE = 10
+CHARACTERS_PER_MESSAGE = 6000
+
+
+def _length(embed: dict) -> int:
+    """The characters in an embed that count towards Discord's limit."""
+    return (
+        len(embed.get("title", ""))
+        + len(embed.get("description", ""))
+        + sum(len(field.get("name", "")) + len(field.get("value", "")) for field in embed.get("fields", ()))
+        + len(embed.get("footer", {}).get("text", ""))
+        + len(embed.get("author", {}).get("name", ""))
+    )
+
+
+class LogSender:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        # channel id -> embeds waiting to be posted there, as dicts.
+        self._queues: typing.Dict[int, typing.Deque[dict]] = collections.defaultdict(collections.deque)
+        self._depth = 0
+        self._space = asyncio.Condition()
+        self._task: typing.Optional[asyncio.Task] = None
+        self.embeds_sent = 0
+        self.messages_sent = 0
+
+    @property
+    def settings(self):
+        return self.bot.config.logs
+
+    @property
+    def depth(self) -> int:
+        """Embeds waiting to be posted."""
+        return self._depth
+
+    async def send(self, channel_id: int, embed) -> None:
+        """Queues an embed to be posted to a channel, waiting first if the queue is full."""
+        embed = embed.to_dict()
+        if _length(embed) > CHARACTERS_PER_MESSAGE:
+            # Discord would reject it on its own, let alone in a batch.
+            self.logger.error(
+                "Dropping embed %r for %s, it has %s characters", embed.get("title"), channel_id, _length(embed)
+            )
+            return
+
+        async with self._space:
+            await self._space.wait_for(lambda: self._depth < self.settings.max_queued)
+            self._queues[channel_id].append(embed)
+            self._depth += 1
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Posts every queued embed, leaving them queued for the next flush if Discord is rate limiting us or can't be
+        reached. A batch Discord rejects outright is split in two until the embeds it won't take are found and dropped.
+        """
+        for channel_id, queue in list(self._queues.items()):
+            # Halves of rejected batches, to be posted before taking any more from the queue.
+            split: typing.Deque[typing.List[dict]] = collections.deque()
+            while queue or split:
+                batch = split.popleft() if split else self._take_batch(queue)
+                try:
+                    route = Route("POST", "/channels/{channel_id}/messages", channel_id=channel_id)
+                    await self.bot.rest.call(
+                        Priority.AUDIT,
+                        ("messages", channel_id),
+                        functools.partial(self.bot.http.request, route, json={"embeds": batch}),
+                    )
+                except asyncio.CancelledError:
+                    self._requeue(queue, batch, split)
+                    raise
+                except (discord.NotFound, discord.Forbidden) as ex:
+                    self.logger.error("Dropping %s embeds for channel %s", len(batch), channel_id, exc_info=ex)
+                except discord.HTTPException as ex:
+                    if ex.status == 429 or ex.status >= 500:
+                        self._requeue(queue, batch, split)
+                        self.logger.error(
+                            "Couldn't post %s embeds to %s, will retry", len(queue), channel_id, exc_info=ex
+                        )
+                        break
+                    if len(batch) > 1:
+                        middle = len(batch) // 2
+                        split.extendleft((batch[middle:], batch[:middle]))
+                        continue
+                    self.logger.error("Dropping an embed for channel %s: %r", channel_id, batch[0], exc_info=ex)
+                else:
+                    self.embeds_sent += len(batch)
+                    self.messages_sent += 1
+
+                await self._release(len(batch))
+
+            if not queue:
+                del self._queues[channel_id]
+
+    @staticmethod
+    def _requeue(queue: typing.Deque[dict], batch: typing.List[dict], split: typing.Deque[typing.List[dict]]) -> None:
+        """Puts a batch, and any halves still waiting behind it, back at the front of the queue in order."""
+        for embeds in reversed((batch, *split)):
+            queue.extendleft(reversed(embeds))
+
+    def _take_batch(self, queue: typing.Deque[dict]) -> typing.List[dict]:
+        batch = [queue.popleft()]
+        characters = _length(batch[0])
+        while queue and len(batch) < EMBEDS_PER_MESSAGE and characters + _length(queue[0]) <= CHARACTERS_PER_MESSAGE:
+            characters += _length(queue[0])
+            batch.append(queue.popleft())
+        return batch
+
+    async def _release(self, count: int) -> None:
+        async with self._space:
+            self._depth -= count
+            self._space.notify_all()
+
+    async def close(self) -> None:
+        """Stops posting in the background and posts whatever is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        await self.flush()
+        if self._depth:
+            self.logger.critical("Lost %s log embeds on shutdown", self._depth)
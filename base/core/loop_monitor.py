@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keeps watch on how late the event loop runs things, and turns away new games while it's falling behind.
+
+Every ``sample_interval`` seconds the monitor sleeps for that long and records how much later than asked it woke up.
+The last ``window`` seconds of samples are kept in a rolling histogram. While more than half of them are over
+``lag_threshold``, the bot is overloaded, and commands that start a game fail the ``not_overloaded`` check. Games
+already under way, and their payouts, carry on as normal.
+"""
+import asyncio
+import logging
+import typing
+
+from discord.ext import commands
+
+from base.utils.histogram import RollingHistogram
+
+LAG_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class Overloaded(commands.CheckFailure):
+    """Raised instead of starting a game while the event loop is behind."""
+
+
+def not_overloaded():
+    """Refuses to start a game while the bot is overloaded."""
+
+    def predicate(ctx) -> bool:
+        if ctx.bot.loop_monitor.overloaded:
+            raise Overloaded("The bot is too busy to start a game")
+        return True
+
+    return commands.check(predicate)
+
+
+class LoopMonitor:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.lag = RollingHistogram(LAG_BOUNDS, round(self.settings.window / self.settings.sample_interval))
+        self.latest = 0.0
+        # Samples in the window over the threshold.
+        self._over = 0
+        self.overloaded = False
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def settings(self):
+        return self.bot.config.loop
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        interval = self.settings.sample_interval
+        while True:
+            start = self.bot.loop.time()
+            await asyncio.sleep(interval)
+            self.observe(max(0.0, self.bot.loop.time() - start - interval))
+
+    def observe(self, lag: float) -> None:
+        threshold = self.settings.lag_threshold
+        if len(self.lag.values) == self.lag.values.maxlen and self.lag.values[0] > threshold:
+            self._over -= 1
+        if lag > threshold:
+            self._over += 1
+
+        self.lag.observe(lag)
+        self.latest = lag
+        self.bot.metrics.observe("loop_lag_seconds", lag)
+
+        overloaded = self._over * 2 > self.lag.count
+        if overloaded != self.overloaded:
+            self.overloaded = overloaded
+            if overloaded:
+                self.logger.warning(
+                    "Event loop is overloaded, refusing new games (p50 lag <= %gs)", self.lag.quantile(0.5)
+                )
+            else:
+                self.logger.info("Event loop has caught up, accepting new games again")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Counters and histograms about the running bot, served in Prometheus' text format along with health checks.
+
+Every command's run time is split into time spent on Postgres, on requests to Discord and waiting for players. The
+command's ``Timings`` live in a context variable set by the ``before_invoke`` hook, and the code that does each kind
+of waiting adds to it through ``record``, so nothing has to be passed down through the cogs.
+"""
+import contextvars
+import dataclasses
+import logging
+import time
+import typing
+
+from aiohttp import web
+
+from base.utils.histogram import Histogram
+
+COMMAND_SECONDS_BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+#: Parts of a command's run time, besides the total.
+PARTS = ("db", "rest", "wait")
+
+Labels = typing.Tuple[typing.Tuple[str, str], ...]
+
+
+@dataclasses.dataclass
+class Timings:
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    db: float = 0.0
+    rest: float = 0.0
+    wait: float = 0.0
+
+
+_timings: contextvars.ContextVar = contextvars.ContextVar("command_timings", default=None)
+
+
+def start_timing() -> None:
+    """Starts adding up where the current command's time goes."""
+    _timings.set(Timings())
+
+
+def current_timings() -> typing.Optional[Timings]:
+    return _timings.get()
+
+
+def record(part: str, seconds: float) -> None:
+    """Adds time spent on one of ``PARTS`` to the current command, if there is one."""
+    timings = _timings.get()
+    if timings is not None:
+        setattr(timings, part, getattr(timings, part) + seconds)
+
+
+def _format_labels(labels: Labels, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        # name -> help text, for everything below.
+        self.help: typing.Dict[str, str] = {}
+        self.counters: typing.Dict[str, typing.Dict[Labels, float]] = {}
+        self.histograms: typing.Dict[str, typing.Dict[Labels, Histogram]] = {}
+        self._histogram_bounds: typing.Dict[str, typing.Sequence[float]] = {}
+        # name -> function returning the gauge's current value, read on every scrape.
+        self.gauges: typing.Dict[str, typing.Callable[[], float]] = {}
+        self._runner: typing.Optional[web.AppRunner] = None
+
+    @property
+    def settings(self):
+        return self.bot.config.metrics
+
+    def counter(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+        self.counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, bounds: typing.Sequence[float]) -> None:
+        self.help[name] = help_text
+        self.histograms.setdefault(name, {})
+        self._histogram_bounds[name] = bounds
+
+    def gauge(self, name: str, help_text: str, read: typing.Callable[[], float]) -> None:
+        self.help[name] = help_text
+        self.gauges[name] = read
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        series = self.counters[name]
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        series = self.histograms[name]
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self._histogram_bounds[name])
+        histogram.observe(value)
+
+    def render(self) -> str:
+        """Every metric, in Prometheus' text exposition format."""
+        lines = []
+        for name, series in self.counters.items():
+            lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} counter"]
+            lines += [f"{name}{_format_labels(labels)} {value:g}" for labels, value in series.items()]
+
+        for name, read in self.gauges.items():
+            try:
+                value = read()
+            except Exception as ex:
+                self.logger.error("Couldn't read %s", name, exc_info=ex)
+                continue
+            lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+
+        for name, series in self.histograms.items():
+            lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} histogram"]
+            for labels, histogram in series.items():
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=le)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    async def start(self) -> None:
+        if not self.settings.enabled:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        app.router.add_get("/healthz", self._healthz)
+        app.router.add_get("/readyz", self._readyz)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.settings.host, self.settings.port).start()
+        self.logger.info("Serving metrics on %s:%s", self.settings.host, self.settings.port)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _metrics(self, _request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def _healthz(self, _request) -> web.Response:
+        # Answering at all means the event loop is running.
+        return web.Response(text="ok")
+
+    async def _readyz(self, _request) -> web.Response:
+        if self.bot.is_ready() and self.bot.statements.pool is not None:
+            return web.Response(text="ready")
+        return web.Response(text="not ready", status=503)
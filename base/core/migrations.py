@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versioned schema migrations.
+
+Migrations live in ``sql/migrations`` as ``NNNN_description.sql`` and are applied in order by ``base migrate``, which
+records each one in ``schema_version``. An advisory lock makes sure only one process migrates at a time.
+
+A migration runs in a transaction along with its ``schema_version`` row, unless its first line is
+``-- migrate: no-transaction``. Those hold a single statement such as ``CREATE INDEX CONCURRENTLY``, which Postgres
+refuses to run inside a transaction.
+"""
+import dataclasses
+import logging
+import os
+import re
+import typing
+
+import asyncpg
+
+_LOGGER = logging.getLogger(__name__)
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "migrations")
+NO_TRANSACTION = "-- migrate: no-transaction"
+#: Key for pg_advisory_lock, shared by every process migrating this database.
+ADVISORY_LOCK = 0x6261_7365
+
+_FILE_NAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    query: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.query.startswith(NO_TRANSACTION)
+
+
+def load(directory: str = MIGRATIONS_DIRECTORY) -> typing.List[Migration]:
+    """Reads every migration, making sure they are numbered 1, 2, 3 and so on without gaps."""
+    migrations = []
+    for file in sorted(os.listdir(directory)):
+        match = _FILE_NAME.match(file)
+        if match is None:
+            raise RuntimeError(f"{file} isn't named like 0001_description.sql")
+
+        with open(os.path.join(directory, file)) as fp:
+            query = fp.read().strip()
+
+        if not query:
+            raise RuntimeError(f"{file} is empty")
+
+        migrations.append(Migration(int(match.group(1)), match.group(2), query))
+
+    for expected, migration in enumerate(migrations, 1):
+        if migration.version != expected:
+            raise RuntimeError(f"Expected migration {expected:04}, found {migration.version:04}_{migration.name}")
+
+    return migrations
+
+
+async def current_version(conn: asyncpg.Connection) -> int:
+    """The last migration applied to this database, or 0 if none have been."""
+    if await conn.fetchval("SELECT to_regclass('schema_version')") is None:
+        return 0
+    return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+
+
+async def check(conn: asyncpg.Connection, migrations: typing.List[Migration] = None) -> int:
+    """Makes sure the database is fully migrated without changing anything, which keeps startup quick."""
+    migrations = load() if migrations is None else migrations
+    version, latest = await current_version(conn), len(migrations)
+
+    if version < latest:
+        raise RuntimeError(f"The database is at schema version {version} but {latest} is needed, run `base migrate`")
+    if version > latest:
+        raise RuntimeError(f"The database is at schema version {version}, which is newer than this code ({latest})")
+
+    _LOGGER.info("Database is at schema version %s", version)
+    return version
+
+
+async def migrate(conn: asyncpg.Connection, migrations: typing.List[Migration] = None) -> typing.List[Migration]:
+    """Applies every pending migration in order, returning those that were applied."""
+    migrations = load() if migrations is None else migrations
+    applied = []
+
+    await conn.execute("SELECT pg_advisory_lock($1)", ADVISORY_LOCK)
+    try:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version     INTEGER         PRIMARY KEY,
+                name        VARCHAR(64)     NOT NULL,
+                applied_at  TIMESTAMPTZ     NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+
+        # Read under the lock, so anything another process applied while we waited is skipped.
+        version = await current_version(conn)
+        for migration in migrations[version:]:
+            _LOGGER.info("Applying migration %04d_%s", migration.version, migration.name)
+
+            if migration.transactional:
+                async with conn.transaction():
+                    await conn.execute(migration.query)
+                    await _record(conn, migration)
+            else:
+                await conn.execute(migration.query)
+                await _record(conn, migration)
+
+            applied.append(migration)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK)
+
+    return applied
+
+
+async def _record(conn: asyncpg.Connection, migration: Migration) -> None:
+    await conn.execute("INSERT INTO schema_version (version, name) VALUES ($1, $2)", migration.version, migration.name)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Durable nonce allocation for the current server seed.
+
+Every user has their own stream of nonces per server seed, so one player's nonces don't depend on anyone else's
+traffic and verifying their rolls only needs their own history. Nonces are leased from Postgres in blocks, so handing
+one out is just an in-memory increment, and a restart carries on after the last leased block instead of rewinding to
+a nonce that has already been used with the same seed.
+"""
+import asyncio
+import logging
+
+NONCE_BLOCK_SIZE = 100
+
+
+class NonceAllocator:
+    def __init__(self, bot, block_size: int = NONCE_BLOCK_SIZE):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.block_size = block_size
+        self.seed_id = None
+        self.server_seed = None
+        # user_id -> [next nonce, end of the leased block]
+        self._streams = {}
+        # user_id -> the task leasing that user's next block, so concurrent rolls share one round trip.
+        self._leases = {}
+
+    def reset(self, seed_id: int, server_seed: str) -> None:
+        """Switches over to a new server seed. Every stream starts again from its next leased block."""
+        self.seed_id, self.server_seed = seed_id, server_seed
+        self._streams.clear()
+        self._leases.clear()
+
+    async def take(self, user_id: int, count: int = 1) -> (str, int):
+        """
+        Reserves ``count`` consecutive nonces in a user's stream, returning the server seed they belong to along with
+        the first of them. This only waits on Postgres when the user has run out of leased nonces.
+
+        If the current block can't fit all of them, the rest of it is skipped. Nonces only need to be unique, not dense.
+        """
+        while True:
+            stream = self._streams.get(user_id)
+            if stream is not None and stream[1] - stream[0] >= count:
+                start = stream[0]
+                stream[0] += count
+                return self.server_seed, start
+
+            await self._lease(user_id, max(count, self.block_size))
+
+    async def _lease(self, user_id: int, block_size: int) -> None:
+        if self.seed_id is None:
+            raise RuntimeError("There is no server seed to roll with yet")
+
+        task = self._leases.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._lease_block(self.seed_id, user_id, block_size))
+            self._leases[user_id] = task
+
+        try:
+            await asyncio.shield(task)
+        finally:
+            if self._leases.get(user_id) is task and task.done():
+                del self._leases[user_id]
+
+    async def _lease_block(self, seed_id: int, user_id: int, block_size: int) -> None:
+        end = await self.bot.statements.fetchval("lease_nonces", seed_id, user_id, block_size)
+        # The seed may have rotated while we were waiting on Postgres.
+        if seed_id == self.seed_id:
+            self._streams[user_id] = [end - block_size, end]
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Open raffles, kept in Postgres with one row per buyer rather than one per ticket.
+
+Tickets are numbered in the order buyers first bought into a raffle, so each buyer holds a contiguous range of them. A
+Fenwick tree over the buyers' ticket counts maps a ticket back to its buyer in O(log buyers), and memory and writes
+grow with the number of buyers, not the number of tickets.
+
+Winners are drawn provably fairly: ``draw_ticket`` hashes the raffle's id, which is public as its nonce, with the
+server seed in use when the raffle was created. That seed's hash is published along with the raffle, so rotating the
+seed before the draw can't change the winner, and anyone can recompute the winning ticket once the seed is revealed.
+
+Raffles used to be kept in ``raffles.json``. Any left open there are imported when the bot starts, and the file is
+renamed so they are only imported once.
+"""
+import collections
+import dataclasses
+import json
+import logging
+import os
+import random
+import typing
+
+import asyncpg
+
+from base.utils.fenwick import FenwickTree
+from base.utils.provably_fair import draw_ticket, hash_seed
+
+NUMBERS = range(1_000, 9_999)
+#: Share of a raffle's takings paid to its winner; the house keeps the rest.
+PAYOUT = 0.95
+#: Where open raffles were kept before Postgres. They were written to the first and read from the second.
+LEGACY_FILES = ("src/raffles.json", "raffles.json")
+
+
+@dataclasses.dataclass
+class Raffle:
+    id: int
+    number: int
+    price: int
+    tickets: int
+    sold: int = 0
+    # The server seed the winner is drawn with, None for raffles made before raffles were tied to one.
+    server_seed_id: typing.Optional[int] = None
+    server_seed: typing.Optional[str] = None
+    # Buyers, and the id of their raffle_entries row, in the order tickets are numbered in.
+    buyers: typing.List[int] = dataclasses.field(default_factory=list)
+    entry_ids: typing.List[int] = dataclasses.field(default_factory=list)
+    # Ticket counts, in the same order as buyers.
+    index: FenwickTree = dataclasses.field(default_factory=FenwickTree)
+    # user_id -> position in buyers.
+    positions: typing.Dict[int, int] = dataclasses.field(default_factory=dict)
+
+    @property
+    def remaining(self) -> int:
+        return self.tickets - self.sold
+
+    @property
+    def seed_hash(self) -> typing.Optional[str]:
+        return hash_seed(self.server_seed) if self.server_seed is not None else None
+
+    @property
+    def payout(self) -> int:
+        return round(self.price * self.tickets * PAYOUT)
+
+    @property
+    def commission(self) -> int:
+        return round(self.price * self.tickets * (1 - PAYOUT))
+
+    def holder(self, ticket: int) -> int:
+        """The buyer holding a ticket."""
+        return self.buyers[self.index.find(ticket)]
+
+    def tickets_of(self, user_id: int) -> typing.Tuple[int, int]:
+        """The half-open range of tickets a buyer holds."""
+        return self.index.range_of(self.positions[user_id])
+
+    def add_entry(self, entry_id: int, user_id: int, tickets: int) -> None:
+        """Updates a buyer's ticket count to match their raffle_entries row."""
+        position = self.positions.get(user_id)
+        if position is not None:
+            self.index.add(position, tickets - self.index[position])
+        elif not self.entry_ids or entry_id > self.entry_ids[-1]:
+            self.positions[user_id] = len(self.buyers)
+            self.buyers.append(user_id)
+            self.entry_ids.append(entry_id)
+            self.index.append(tickets)
+        else:
+            # Two new buyers' purchases finished out of order, so renumber to match the rows.
+            entries = sorted([*zip(self.entry_ids, self.buyers, self.index), (entry_id, user_id, tickets)])
+            self.set_entries(entries)
+
+    def set_entries(self, entries: typing.Iterable[typing.Tuple[int, int, int]]) -> None:
+        """Replaces every buyer with (entry id, user_id, tickets) rows, which must be ordered by entry id."""
+        entries = list(entries)
+        self.entry_ids = [entry_id for entry_id, _, _ in entries]
+        self.buyers = [user_id for _, user_id, _ in entries]
+        self.index = FenwickTree(tickets for _, _, tickets in entries)
+        self.positions = {user_id: position for position, user_id in enumerate(self.buyers)}
+
+
+class Raffles:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        # number -> open raffle
+        self.open: typing.Dict[int, Raffle] = {}
+
+    def __contains__(self, number: int) -> bool:
+        return number in self.open
+
+    def __getitem__(self, number: int) -> Raffle:
+        return self.open[number]
+
+    def __iter__(self) -> typing.Iterator[Raffle]:
+        return iter(self.open.values())
+
+    def __len__(self) -> int:
+        return len(self.open)
+
+    async def load(self) -> None:
+        """Loads every open raffle, so they carry on after a restart."""
+        await self._import_legacy()
+        for row in await self.bot.statements.fetch("get_open_raffles"):
+            raffle = Raffle(
+                row["id"], row["number"], row["price"], row["tickets"], row["sold"], row["server_seed_id"], row["seed"]
+            )
+            entries = await self.bot.statements.fetch("get_raffle_entries", raffle.id)
+            raffle.set_entries((entry["id"], entry["user_id"], entry["tickets"]) for entry in entries)
+            self.open[raffle.number] = raffle
+
+        self.logger.info("Loaded %s open raffles", len(self.open))
+
+    async def _import_legacy(self) -> None:
+        """Imports the open raffles, and who holds their tickets, from before raffles were kept in Postgres."""
+        paths = [path for path in LEGACY_FILES if os.path.exists(path)]
+        if not paths:
+            return
+
+        with open(paths[0]) as fp:
+            legacy = json.load(fp)
+
+        for number, raffle in legacy.items():
+            # One user_id per ticket, in the order they were bought.
+            held = collections.Counter(raffle["members"])
+            sold = sum(held.values())
+            if sold > raffle["tickets"]:
+                self.logger.warning(
+                    "Raffle %s sold %s of %s tickets, importing it with %s", number, sold, raffle["tickets"], sold
+                )
+            await self.bot.statements.execute(
+                "import_raffle",
+                int(number),
+                raffle["price"],
+                max(raffle["tickets"], sold),
+                list(held),
+                list(held.values()),
+            )
+
+        for path in paths:
+            os.replace(path, path + ".imported")
+        self.logger.info("Imported %s open raffles from %s", len(legacy), paths[0])
+
+    async def create(self, price: int, tickets: int) -> Raffle:
+        """Opens a raffle, to be drawn with the current server seed."""
+        server_seed_id, server_seed = self.bot.nonces.seed_id, self.bot.nonces.server_seed
+        if server_seed_id is None:
+            raise RuntimeError("There is no server seed to draw with yet")
+
+        number = random.choice(list(set(NUMBERS) - set(self.open)))
+        row = await self.bot.statements.fetchrow("add_raffle", number, price, tickets, server_seed_id)
+        raffle = self.open[number] = Raffle(
+            row["id"],
+            row["number"],
+            row["price"],
+            row["tickets"],
+            server_seed_id=server_seed_id,
+            server_seed=server_seed,
+        )
+        return raffle
+
+    async def buy(self, raffle: Raffle, user_id: int, tickets: int) -> typing.Optional[asyncpg.Record]:
+        """
+        Takes payment for tickets and hands them out in one statement, returning the buyer's currency row, or None if
+        there aren't enough tickets left or the buyer can't afford them.
+        """
+        row = await self.bot.statements.fetchrow("buy_raffle_tickets", raffle.id, user_id, tickets)
+        if row is None:
+            return None
+
+        self.bot.ledger.start_round("raffle")
+        await self.bot.ledger.record(user_id, raffle.price * tickets, "debit")
+        self.bot.balance.forget(user_id)
+        # Purchases are made one at a time in Postgres, but can finish here in any order.
+        raffle.sold = max(raffle.sold, row["sold"])
+        raffle.add_entry(row["entry_id"], user_id, row["entry_tickets"])
+        return row
+
+    async def draw(self, raffle: Raffle) -> typing.Tuple[int, int, typing.Dict[int, asyncpg.Record]]:
+        """
+        Draws the winning ticket of a sold out raffle with its server seed, then closes the raffle and pays
+        out its winner and the house. Returns the ticket, the winner and their updated currency rows.
+
+        Raises ValueError if the raffle has already been drawn, or is being drawn.
+        """
+        if self.open.get(raffle.number) is not raffle:
+            raise ValueError(f"Raffle {raffle.number} is not open")
+        # Closed before anything is awaited, so it can only be drawn once.
+        del self.open[raffle.number]
+
+        try:
+            server_seed_id, server_seed = raffle.server_seed_id, raffle.server_seed
+            if server_seed_id is None:
+                server_seed_id, server_seed = self.bot.nonces.seed_id, self.bot.nonces.server_seed
+            if server_seed_id is None:
+                raise RuntimeError("There is no server seed to draw with yet")
+
+            ticket = draw_ticket(server_seed, raffle.id, raffle.sold)
+            winner_id = raffle.holder(ticket)
+
+            generation = self.bot.balance.generation
+            rows = await self.bot.statements.fetch(
+                "end_raffle",
+                raffle.id,
+                winner_id,
+                ticket,
+                raffle.payout,
+                self.bot.user.id,
+                raffle.commission,
+                server_seed_id,
+            )
+        except BaseException:
+            self.open[raffle.number] = raffle
+            raise
+
+        if not rows:
+            raise ValueError(f"Raffle {raffle.number} has already been drawn")
+
+        rows = {row["user_id"]: self.bot.balance.remember(row, generation) for row in rows}
+        self.bot.ledger.start_round("raffle")
+        await self.bot.ledger.record(winner_id, raffle.payout, "credit")
+        await self.bot.ledger.record(self.bot.user.id, raffle.commission, "credit")
+        return ticket, winner_id, rows
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orders our requests to Discord by how much somebody is waiting on them.
+
+discord.py sends requests in whatever order they are awaited, so once we are rate limited a player's roll can queue
+behind log embeds and room edits. Requests here go through one of three queues instead, interactive game output first,
+then room management, then audit logs. Each route has a token bucket shaped like Discord's limit for it, along with a
+global bucket, so a request is only started once it would be let through, and whenever several are waiting the most
+urgent goes first. A 429 that gets through anyway blocks its route for as long as Discord asks. Each queue is bounded,
+so callers wait for room in it rather than queueing without limit.
+"""
+import asyncio
+import collections
+import dataclasses
+import enum
+import logging
+import time
+import typing
+
+import discord
+
+from base.utils.histogram import Histogram
+from . import metrics
+
+#: Discord lets through five messages every five seconds per channel, and fifty requests a second overall.
+ROUTE_LIMIT = 5
+ROUTE_PERIOD = 5.0
+GLOBAL_LIMIT = 50
+GLOBAL_PERIOD = 1.0
+WAIT_BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Route = typing.Hashable
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    ROOMS = 1
+    AUDIT = 2
+
+
+@dataclasses.dataclass
+class Bucket:
+    limit: int
+    period: float
+    tokens: float = dataclasses.field(init=False)
+    updated: float = dataclasses.field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+
+    def __post_init__(self):
+        self.tokens = self.limit
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a request could be let through, 0 if it could be now."""
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.period)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return max(0.0, (1 - self.tokens) * self.period / self.limit)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def block(self, now: float, retry_after: float) -> None:
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+@dataclasses.dataclass(eq=False)
+class _Job:
+    priority: Priority
+    route: Route
+    factory: typing.Callable[[], typing.Awaitable]
+    future: asyncio.Future
+    queued_at: float
+
+
+class RestScheduler:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self._queues: typing.Dict[Priority, typing.Deque[_Job]] = {
+            priority: collections.deque() for priority in Priority
+        }
+        self._slots = {priority: asyncio.Semaphore(self.settings.max_queued) for priority in Priority}
+        self._buckets: typing.Dict[Route, Bucket] = {}
+        self._global = Bucket(GLOBAL_LIMIT, GLOBAL_PERIOD)
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+        # Seconds each request spent queued, by priority.
+        self.waits = {priority: Histogram(WAIT_BOUNDS) for priority in Priority}
+
+    @property
+    def settings(self):
+        return self.bot.config.rest
+
+    def depth(self, priority: Priority) -> int:
+        """Requests of a priority waiting to be sent."""
+        return len(self._queues[priority])
+
+    async def call(self, priority: Priority, route: Route, factory: typing.Callable[[], typing.Awaitable]):
+        """Makes a request once the route and its priority allow, returning its result."""
+        start = time.perf_counter()
+        try:
+            if self._task is None or self._task.done():
+                # Not started yet, or shutting down.
+                return await factory()
+
+            await self._slots[priority].acquire()
+            job = _Job(priority, route, factory, self.bot.loop.create_future(), time.monotonic())
+            self._queues[priority].append(job)
+            self._wakeup.set()
+            return await job.future
+        finally:
+            metrics.record("rest", time.perf_counter() - start)
+
+    async def send(self, destination, *args, priority: Priority = Priority.INTERACTIVE, **kwargs) -> discord.Message:
+        """``destination.send``, for a channel or a context."""
+        channel_id = getattr(destination, "channel", destination).id
+        return await self.call(priority, ("messages", channel_id), lambda: destination.send(*args, **kwargs))
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            job, delay = self._next()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.bot.loop.create_task(self._run(job))
+
+    def _bucket(self, route: Route) -> Bucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = Bucket(ROUTE_LIMIT, ROUTE_PERIOD)
+        return bucket
+
+    def _next(self) -> typing.Tuple[typing.Optional[_Job], typing.Optional[float]]:
+        """The most urgent job that can be sent now, or how long until one could be."""
+        now = time.monotonic()
+        delay = self._global.wait_time(now)
+        if delay:
+            return None, delay
+
+        delay = None
+        for priority, queue in self._queues.items():
+            for job in list(queue):
+                if job.future.cancelled():
+                    queue.remove(job)
+                    self._slots[priority].release()
+                    continue
+
+                wait = self._bucket(job.route).wait_time(now)
+                if wait:
+                    delay = wait if delay is None else min(delay, wait)
+                    continue
+
+                queue.remove(job)
+                self._slots[priority].release()
+                self._bucket(job.route).take()
+                self._global.take()
+                return job, None
+        return None, delay
+
+    async def _run(self, job: _Job) -> None:
+        self.waits[job.priority].observe(time.monotonic() - job.queued_at)
+        try:
+            result = await job.factory()
+        except Exception as ex:
+            if isinstance(ex, discord.HTTPException) and ex.status == 429:
+                retry_after = float(ex.response.headers.get("Retry-After", ROUTE_PERIOD))
+                self._bucket(job.route).block(time.monotonic(), retry_after)
+                self.logger.warning("Rate limited on %s for %.2fs", job.route, retry_after)
+            if not job.future.done():
+                job.future.set_exception(ex)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def close(self) -> None:
+        """Stops ordering requests, and sends whatever is still queued straight away."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        for priority, queue in self._queues.items():
+            while queue:
+                self._slots[priority].release()
+                await self._run(queue.popleft())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A pool of game rooms, kept warm under the game_room category so starting a game doesn't wait on creating a channel.
+
+Idle rooms are hidden from everyone. Checking one out renames it after the game and sets its overwrites in a single
+edit, and releasing it purges its messages and hides it again, leaving its old name until it is next checked out.
+Discord only lets a channel be renamed twice every ten minutes, so rooms that have used that up are passed over, and
+a room is only created on the spot when no idle room can be renamed. The pool is topped back up in the background, and
+rooms released while ``pool_size`` are already idle are deleted, so a busy spell doesn't leave the pool any bigger.
+
+Discord allows 50 channels in a category, so there are never more than ``max_rooms`` rooms. At that limit, an idle
+room that can't be renamed is deleted to make space for a new one, and once every room is busy, new games wait up to
+``checkout_timeout`` seconds for one to be released.
+"""
+import asyncio
+import collections
+import functools
+import logging
+import time
+import typing
+
+import discord
+
+from .rest import Priority
+
+#: Marks a channel as one of ours, so idle rooms are picked back up after a restart.
+ROOM_TOPIC = "A game room, reused between games"
+IDLE_NAME = "free-room"
+RENAMES_PER_WINDOW = 2
+RENAME_WINDOW = 600
+# Seconds to wait before trying to create rooms again after Discord refused to.
+REFILL_RETRY_DELAY = 30
+
+
+class RoomPool:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.idle: typing.Deque[discord.TextChannel] = collections.deque()
+        # channel id -> the name a room was checked out under.
+        self.busy: typing.Dict[int, str] = {}
+        # channel id -> when each of its recent renames happened.
+        self._renames: typing.Dict[int, typing.Deque[float]] = collections.defaultdict(collections.deque)
+        self._low = asyncio.Event()
+        # Notified whenever a room is released, for games waiting for space to create one.
+        self._space = asyncio.Condition()
+        self._creating = 0
+        self._task: typing.Optional[asyncio.Task] = None
+        bot.scheduler.register("release_room", self._release_action)
+
+    @property
+    def settings(self):
+        return self.bot.config.rooms
+
+    @property
+    def category(self) -> discord.CategoryChannel:
+        return self.bot.get_channel(self.bot.config.categories["game_room"])
+
+    def __len__(self) -> int:
+        return len(self.idle)
+
+    @property
+    def total(self) -> int:
+        """Rooms we have, or are creating."""
+        return len(self.idle) + len(self.busy) + self._creating
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        await self.bot.wait_until_ready()
+        await self._adopt()
+
+        while True:
+            await self._low.wait()
+            self._low.clear()
+            try:
+                while len(self.idle) < self.settings.pool_size and self.total < self.settings.max_rooms:
+                    self.idle.append(await self._create(IDLE_NAME, self._idle_overwrites()))
+            except discord.HTTPException as ex:
+                self.logger.error(
+                    "Couldn't top up the room pool, %s of %s rooms",
+                    len(self.idle),
+                    self.settings.pool_size,
+                    exc_info=ex,
+                )
+                await asyncio.sleep(REFILL_RETRY_DELAY)
+                self._low.set()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def checkout(self, name: str, overwrites: dict) -> discord.TextChannel:
+        """
+        Hands out a room for a game, renamed to ``name`` and visible to the players in ``overwrites``. Raises
+        ``asyncio.TimeoutError`` if every room stays in use for ``checkout_timeout`` seconds.
+        """
+        if not self.idle and self.total >= self.settings.max_rooms:
+            self.logger.warning("All %s game rooms are in use, waiting for one", self.total)
+            async with self._space:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: self.idle or self.total < self.settings.max_rooms),
+                    self.settings.checkout_timeout,
+                )
+
+        channel = self._take_renameable()
+        self._low.set()
+
+        if channel is not None:
+            self.busy[channel.id] = name
+            try:
+                await self._rest(
+                    ("channel", channel.id),
+                    functools.partial(channel.edit, name=name, overwrites=overwrites, reason="Game room checked out"),
+                )
+            except discord.NotFound:
+                # Somebody deleted the room by hand while it was idle.
+                self.busy.pop(channel.id, None)
+                self._renames.pop(channel.id, None)
+                channel = None
+            else:
+                self._renames[channel.id].append(time.monotonic())
+
+        if channel is None:
+            self.logger.info("No idle room can be renamed, creating room %s", name)
+            channel = await self._create(name, overwrites, make_space=True)
+            self.busy[channel.id] = name
+
+        return channel
+
+    async def release(self, channel: discord.TextChannel) -> typing.Optional[str]:
+        """
+        Purges a room and puts it back in the pool, or deletes it if the pool is already full, returning the name it was
+        checked out under.
+        """
+        name = self.busy.get(channel.id)
+        # Nothing should still be waiting on a finished game, but don't let anything that is see the next one.
+        self.bot.router.cancel(channel.id)
+        try:
+            if len(self.idle) >= self.settings.pool_size:
+                await self._delete(channel, "Game room pool is full")
+            else:
+                await self._rest(("messages", channel.id), functools.partial(channel.purge, limit=None))
+                await self._rest(
+                    ("channel", channel.id),
+                    functools.partial(channel.edit, overwrites=self._idle_overwrites(), reason="Game room released"),
+                )
+                self.idle.append(channel)
+        except discord.NotFound:
+            self._renames.pop(channel.id, None)
+        except discord.HTTPException as ex:
+            self.logger.error("Couldn't return room %s to the pool, deleting it", name, exc_info=ex)
+            await self._delete(channel, "Game room couldn't be reused")
+        finally:
+            # Counted as busy until now, so nobody creates a room in its place before it's gone.
+            self.busy.pop(channel.id, None)
+            async with self._space:
+                self._space.notify_all()
+        return name
+
+    async def release_after(self, channel: discord.TextChannel, delay: float) -> None:
+        """Releases a room, and frees its game number, after a delay."""
+        payload = {"channel_id": channel.id, "name": self.busy[channel.id]}
+        await self.bot.scheduler.schedule(delay, "release_room", payload)
+
+    async def _release_action(self, payload: dict) -> None:
+        # Rooms that were busy when the bot restarted have already been released by _adopt, and may be in use again.
+        channel = self.bot.get_channel(payload["channel_id"])
+        if channel is None or self.busy.get(channel.id) != payload["name"]:
+            return
+
+        await self.release(channel)
+        self.bot.game_numbers.discard(int(payload["name"]))
+
+    def _take_renameable(self) -> typing.Optional[discord.TextChannel]:
+        now = time.monotonic()
+        for channel in self.idle:
+            renames = self._renames[channel.id]
+            while renames and now - renames[0] >= RENAME_WINDOW:
+                renames.popleft()
+            if len(renames) < RENAMES_PER_WINDOW:
+                self.idle.remove(channel)
+                return channel
+        return None
+
+    def _rest(self, route, factory):
+        return self.bot.rest.call(Priority.ROOMS, route, factory)
+
+    def _idle_overwrites(self) -> dict:
+        return {self.category.guild.default_role: discord.PermissionOverwrite(read_messages=False)}
+
+    async def _create(self, name: str, overwrites: dict, make_space: bool = False) -> discord.TextChannel:
+        """
+        Creates a room once there are fewer than ``max_rooms``. With ``make_space``, an idle room is deleted to make
+        space, rather than waiting for a busy one to be released.
+        """
+        async with self._space:
+            while self.total >= self.settings.max_rooms:
+                if make_space and self.idle:
+                    await self._delete(self.idle.popleft(), "Making space for a new game room")
+                else:
+                    await self._space.wait()
+            self._creating += 1
+
+        guild = self.category.guild
+        create = functools.partial(
+            guild.create_text_channel, name=name, category=self.category, overwrites=overwrites, topic=ROOM_TOPIC
+        )
+        try:
+            channel = await self._rest(("guild_channels", guild.id), create)
+        finally:
+            self._creating -= 1
+        self._renames[channel.id].append(time.monotonic())
+        return channel
+
+    async def _delete(self, channel: discord.TextChannel, reason: str) -> None:
+        self._renames.pop(channel.id, None)
+        try:
+            await self._rest(("channel", channel.id), functools.partial(channel.delete, reason=reason))
+        except discord.NotFound:
+            pass
+
+    async def _adopt(self) -> None:
+        """Picks up the rooms left from before a restart, releasing any whose game never finished."""
+        idle = self._idle_overwrites()
+        for channel in self.category.text_channels:
+            if channel.topic != ROOM_TOPIC:
+                continue
+
+            if channel.overwrites == idle:
+                self.idle.append(channel)
+            else:
+                await self.release(channel)
+
+        self.logger.info("Found %s idle game rooms", len(self.idle))
+        self._low.set()
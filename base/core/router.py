@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hands messages to the games waiting on them, without checking every waiting game against every message.
+
+``Bot.wait_for`` runs every pending check on every message, so each message costs more the more games are open. The
+router splits each message into its channel, author, lowercased verb and arguments once, and files waiters under the
+(channel id, author id, verb) they are waiting for, any of which may be left out to match anything. A message is then
+only offered to the waiters in the (at most eight) buckets it could match.
+"""
+import asyncio
+import collections
+import dataclasses
+import itertools
+import time
+import typing
+
+from . import metrics
+
+Key = typing.Tuple[typing.Optional[int], typing.Optional[int], typing.Optional[str]]
+
+
+@dataclasses.dataclass(frozen=True)
+class Command:
+    message: typing.Any
+    # The first word of the message, lowercased, e.g. "!call", and the rest of its words.
+    verb: str
+    args: typing.Tuple[str, ...]
+
+    @classmethod
+    def from_message(cls, message) -> "Command":
+        words = message.content.lower().split()
+        return cls(message, words[0] if words else "", tuple(words[1:]))
+
+    @property
+    def author(self):
+        return self.message.author
+
+    @property
+    def channel(self):
+        return self.message.channel
+
+
+@dataclasses.dataclass(eq=False)
+class _Waiter:
+    future: asyncio.Future
+    keys: typing.List[Key]
+    check: typing.Optional[typing.Callable[[Command], bool]]
+
+
+class Router:
+    def __init__(self):
+        self._waiters: typing.Dict[Key, typing.List[_Waiter]] = collections.defaultdict(list)
+
+    def __len__(self) -> int:
+        """Waiters still waiting."""
+        return len({id(waiter) for waiters in self._waiters.values() for waiter in waiters})
+
+    async def wait_for(
+        self,
+        channel_id: typing.Optional[int] = None,
+        author_id: typing.Optional[int] = None,
+        verbs: typing.Union[str, typing.Iterable[str], None] = None,
+        *,
+        check: typing.Optional[typing.Callable[[Command], bool]] = None,
+        timeout: typing.Optional[float] = None,
+    ) -> Command:
+        """
+        Waits for a message in a channel, from an author, starting with one of some verbs, that passes ``check``.
+        Leaving any of them out matches everything. Raises ``asyncio.TimeoutError`` after ``timeout`` seconds.
+        """
+        if verbs is None or isinstance(verbs, str):
+            verbs = [verbs]
+
+        waiter = _Waiter(asyncio.get_event_loop().create_future(), [], check)
+        for verb in verbs:
+            key = (channel_id, author_id, verb)
+            waiter.keys.append(key)
+            self._waiters[key].append(waiter)
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        finally:
+            self._remove(waiter)
+            metrics.record("wait", time.perf_counter() - start)
+
+    def dispatch(self, message) -> None:
+        """Offers a message to everyone waiting on it."""
+        command = Command.from_message(message)
+        channel_id, author_id = message.channel.id, message.author.id
+
+        for key in itertools.product((channel_id, None), (author_id, None), (command.verb, None)):
+            waiters = self._waiters.get(key)
+            if not waiters:
+                continue
+
+            for waiter in list(waiters):
+                if waiter.future.done():
+                    continue
+                try:
+                    if waiter.check is not None and not waiter.check(command):
+                        continue
+                except Exception as ex:
+                    waiter.future.set_exception(ex)
+                else:
+                    waiter.future.set_result(command)
+                self._remove(waiter)
+
+    def cancel(self, channel_id: int) -> int:
+        """Cancels everyone waiting on a channel in particular, returning how many there were."""
+        cancelled = {
+            id(waiter): waiter for key, waiters in self._waiters.items() if key[0] == channel_id for waiter in waiters
+        }
+        for waiter in cancelled.values():
+            waiter.future.cancel()
+            self._remove(waiter)
+        return len(cancelled)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        for key in waiter.keys:
+            waiters = self._waiters.get(key)
+            if waiters is None:
+                continue
+
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            if not waiters:
+                del self._waiters[key]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Work put off until later, like archiving a channel once a game is over, without a task sleeping until it's due.
+
+Every scheduled task is a row in ``scheduled_tasks`` naming a registered action and its JSON payload, and a heap of
+the same tasks ordered by when they are due is kept in memory. A single loop sleeps until the earliest one, so pending
+tasks cost a heap entry rather than a coroutine each. Rows are only deleted once their action has run, and they are
+loaded back when the bot starts, so nothing is forgotten over a restart. An action may therefore run twice if the bot
+stops part way through it, and should cope with its work already being done.
+"""
+import asyncio
+import datetime
+import heapq
+import json
+import logging
+import typing
+
+Action = typing.Callable[[dict], typing.Awaitable[None]]
+
+
+class Scheduler:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.actions: typing.Dict[str, Action] = {}
+        # (run_at, id, action, payload), earliest first.
+        self._heap: typing.List[typing.Tuple[datetime.datetime, int, str, dict]] = []
+        self._changed = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+        self._running: typing.Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def pending(self, action: str) -> typing.List[dict]:
+        """The payloads of every task waiting to run an action."""
+        return [payload for _, _, name, payload in self._heap if name == action]
+
+    def register(self, action: str, handler: Action) -> None:
+        """Names a coroutine function taking a payload, so tasks can be scheduled to run it."""
+        self.actions[action] = handler
+
+    async def load(self) -> None:
+        """Loads every task left from before a restart."""
+        for row in await self.bot.statements.fetch("get_scheduled_tasks"):
+            heapq.heappush(self._heap, (row["run_at"], row["id"], row["action"], json.loads(row["payload"])))
+
+        self.logger.info("Loaded %s scheduled tasks", len(self._heap))
+        self._changed.set()
+
+    async def schedule(
+        self, at: typing.Union[datetime.datetime, float], action: str, payload: typing.Optional[dict] = None
+    ) -> int:
+        """
+        Runs an action with a payload at a given time, or a number of seconds from now. Returns the task's id.
+        """
+        if action not in self.actions:
+            raise KeyError(f"No action called {action} is registered")
+
+        if not isinstance(at, datetime.datetime):
+            at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=at)
+        payload = payload or {}
+
+        task_id = await self.bot.statements.fetchval("add_scheduled_task", at, action, json.dumps(payload))
+        heapq.heappush(self._heap, (at, task_id, action, payload))
+        if self._heap[0][1] == task_id:
+            self._changed.set()
+        return task_id
+
+    def start(self) -> None:
+        self._task = self.bot.loop.create_task(self.run())
+
+    async def run(self) -> None:
+        # Actions mostly need Discord's cache, so don't run anything that was due during a restart before it's filled.
+        await self.bot.wait_until_ready()
+
+        while True:
+            self._changed.clear()
+            if not self._heap:
+                await self._changed.wait()
+                continue
+
+            delay = (self._heap[0][0] - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, task_id, action, payload = heapq.heappop(self._heap)
+            task = self.bot.loop.create_task(self._run(task_id, action, payload))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, task_id: int, action: str, payload: dict) -> None:
+        handler = self.actions.get(action)
+        if handler is None:
+            self.logger.error("Dropping scheduled task %s, no action called %s is registered", task_id, action)
+        else:
+            try:
+                await handler(payload)
+            except Exception as ex:
+                self.logger.error("Scheduled task %s (%s %s) failed", task_id, action, payload, exc_info=ex)
+
+        await self.bot.statements.execute("delete_scheduled_task", task_id)
+
+    async def close(self) -> None:
+        """Stops running tasks. Any that were part way through are run again after a restart."""
+        for task in [self._task, *self._running]:
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server seed rotation.
+
+Seeds are either random, or revealed backwards from a precomputed hash chain so that rotating is just bumping an index
+and any revealed seed can be checked against the chain's published tip.
+
+Only one process rotates seeds, whichever holds the advisory lock. It holds the lock on a connection of its own, so
+the lock is let go if the process dies and another one takes over within ``TAKEOVER_DELAY`` seconds. A trigger on
+``server_seeds`` notifies every process of each new seed, and the others switch over to it, so every process always
+rolls with the same seed. Asking any process to rotate notifies the rotator, which does the rotating.
+"""
+import asyncio
+import logging
+import secrets
+import typing
+
+import asyncpg
+import discord
+
+from base.utils.embeds import Embed
+from base.utils.provably_fair import build_seed_chain, hash_seed
+
+SEED_CHANNEL = "server_seeds"
+ROTATE_CHANNEL = "rotate_seed"
+#: Key for pg_try_advisory_lock, held by the process that rotates seeds.
+ROTATOR_LOCK = 0x7365_6564
+#: Seconds between a follower's attempts to take over rotating, and between checks that our connection is still up.
+TAKEOVER_DELAY = 30
+
+
+class SeedManager:
+    def __init__(self, bot):
+        self.logger = logging.getLogger(__name__)
+        self.bot = bot
+        self.current = None
+        self._chain = None
+        self._chain_seeds = None
+        self._rotate_now = asyncio.Event()
+        self._connection: typing.Optional[asyncpg.Connection] = None
+        self.rotating = False
+
+    @property
+    def settings(self):
+        return self.bot.config.provably_fair
+
+    async def rotate(self) -> None:
+        """Rotates the server seed now, rather than once the current one reaches the end of its lifetime."""
+        await self.bot.statements.execute("request_seed_rotation")
+
+    async def run(self) -> None:
+        await self.bot.wait_until_ready()
+
+        channel = discord.utils.get(self.bot.get_all_channels(), name="seeds")
+        while not self.bot.is_closed():
+            try:
+                await self._connect()
+            except (OSError, asyncpg.PostgresError) as ex:
+                self.logger.warning("Couldn't connect to follow server seeds: %s", ex)
+                await asyncio.sleep(TAKEOVER_DELAY)
+                continue
+
+            try:
+                while not self.bot.is_closed() and not self._connection.is_closed():
+                    if await self._connection.fetchval("SELECT pg_try_advisory_lock($1)", ROTATOR_LOCK):
+                        await self._rotate(channel)
+                    else:
+                        # We may have missed seeds while we weren't listening.
+                        await self._follow()
+                        await self._wait(TAKEOVER_DELAY)
+            except (OSError, asyncpg.PostgresError) as ex:
+                self.logger.warning("Lost the server seed connection: %s", ex)
+            finally:
+                self.rotating = False
+                await self._disconnect()
+
+    async def close(self) -> None:
+        await self._disconnect()
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(**self.bot.config.postgres.connection_dict())
+        await connection.add_listener(SEED_CHANNEL, self._on_seed)
+        await connection.add_listener(ROTATE_CHANNEL, self._on_rotate)
+        self._connection = connection
+
+    async def _disconnect(self) -> None:
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+
+    def _on_seed(self, _connection, _pid, _channel, _payload: str) -> None:
+        self.bot.loop.create_task(self._follow())
+
+    def _on_rotate(self, _connection, _pid, _channel, _payload: str) -> None:
+        if self.rotating:
+            self._rotate_now.set()
+
+    async def _follow(self) -> None:
+        """Switches over to the newest server seed, if we aren't using it already."""
+        row = await self.bot.statements.fetchrow("get_server_seed")
+        if row is not None and (self.current is None or row["id"] != self.current["id"]):
+            self._activate(row)
+            self.logger.info("Following server seed %s", row["id"])
+
+    async def _rotate(self, channel) -> None:
+        """Rotates seeds for every process, until we lose the connection holding the lock."""
+        self.logger.info("Rotating server seeds for every process")
+        self.rotating = True
+        self._rotate_now.clear()
+        previous = await self.bot.statements.fetchrow("get_server_seed")
+
+        if self.settings.seed_chain_length:
+            # Build the chain up front so the first rotation doesn't have to.
+            await self._load_chain(channel)
+
+        if previous is not None and previous["age"] < self.settings.seed_lifetime:
+            # Carry on with the seed we were using before the restart. Nonces carry on from the next leased blocks.
+            self._activate(previous)
+            self.logger.info("Resuming server seed %s", previous["id"])
+
+            if not await self._wait(self.settings.seed_lifetime - previous["age"]):
+                return
+
+        while not self.bot.is_closed():
+            server_seed, chain_id = await self._next_seed(channel)
+            row = await self.bot.statements.fetchrow("add_server_seed", server_seed, hash_seed(server_seed), chain_id)
+            self._activate(row)
+
+            await channel.send(
+                embed=Embed(
+                    title="Provably Fair",
+                    description=f"**Previous Hash:** {previous['seed_hash'] if previous else None}\n"
+                    f"**Previous Seed:** {previous['seed'] if previous else None}\n"
+                    f"**Current Hash:** {row['seed_hash']}",
+                )
+            )
+            previous = row
+
+            if not await self._wait(self.settings.seed_lifetime):
+                return
+
+    def _activate(self, row) -> None:
+        self.current = row
+        self.bot.server_seed, self.bot.server_seed_hash = row["seed"], row["seed_hash"]
+        self.bot.nonces.reset(row["id"], row["seed"])
+
+    async def _wait(self, delay: float) -> bool:
+        """
+        Waits ``delay`` seconds, or until a rotation is asked for. Returns False early if our connection drops, since
+        that lets go of the lock and another process may already be rotating.
+        """
+        deadline = self.bot.loop.time() + delay
+        while not self._rotate_now.is_set():
+            remaining = deadline - self.bot.loop.time()
+            if remaining <= 0:
+                break
+            if self._connection.is_closed():
+                return False
+
+            try:
+                await asyncio.wait_for(self._rotate_now.wait(), min(remaining, TAKEOVER_DELAY))
+            except asyncio.TimeoutError:
+                pass
+
+        self._rotate_now.clear()
+        return True
+
+    async def _next_seed(self, channel) -> (str, int):
+        if not self.settings.seed_chain_length:
+            return secrets.token_hex(32), None
+
+        await self._load_chain(channel)
+        # Rotating is just an index bump, which is atomic so other processes never reveal the same seed.
+        revealed = await self.bot.statements.fetchval("advance_seed_chain", self._chain["id"])
+
+        if revealed is None:
+            self.logger.info("Seed chain %s has been used up", self._chain["id"])
+            await self._new_chain(channel)
+            revealed = await self.bot.statements.fetchval("advance_seed_chain", self._chain["id"])
+
+        return self._chain_seeds[self._chain["length"] - revealed], self._chain["id"]
+
+    async def _load_chain(self, channel) -> None:
+        row = await self.bot.statements.fetchrow("get_seed_chain")
+
+        if row is None:
+            await self._new_chain(channel)
+        elif self._chain is None or self._chain["id"] != row["id"]:
+            self.logger.info("Building seed chain %s", row["id"])
+            self._chain_seeds = await self.bot.loop.run_in_executor(
+                None, build_seed_chain, row["master_seed"], row["length"]
+            )
+            self._chain = row
+
+    async def _new_chain(self, channel) -> None:
+        master_seed = secrets.token_hex(32)
+        length = self.settings.seed_chain_length
+
+        self.logger.info("Building a new seed chain of %s seeds", length)
+        seeds = await self.bot.loop.run_in_executor(None, build_seed_chain, master_seed, length)
+        self._chain = await self.bot.statements.fetchrow("add_seed_chain", master_seed, length, seeds[-1])
+        self._chain_seeds = seeds
+
+        await channel.send(
+            embed=Embed(
+                title="New Seed Chain",
+                description=f"The next {length:,} server seeds each hash to the seed revealed before them, and the "
+                f"first one hashes to:\n**Chain Tip:** {self._chain['tip']}",
+            )
+        )
@@ -0,0 +1,8 @@
+-- $1 = number
+-- $2 = price
+-- $3 = tickets
+-- $4 = server seed id the raffle will be drawn with
+
+INSERT INTO raffles (number, price, tickets, server_seed_id)
+VALUES ($1, $2, $3, $4)
+RETURNING *;
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- $1 = run_at
+-- $2 = action
+-- $3 = payload
+
+INSERT INTO scheduled_tasks (run_at, action, payload)
+VALUES ($1, $2, $3::JSONB)
+RETURNING id;
\ No newline at end of file
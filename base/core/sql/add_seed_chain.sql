@@ -0,0 +1,7 @@
+-- $1 = master_seed
+-- $2 = length
+-- $3 = tip
+
+INSERT INTO seed_chains (master_seed, length, tip)
+VALUES ($1, $2, $3)
+RETURNING *;
\ No newline at end of file
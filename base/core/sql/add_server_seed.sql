@@ -0,0 +1,7 @@
+-- $1 = seed
+-- $2 = seed_hash
+-- $3 = chain_id
+
+INSERT INTO server_seeds (seed, seed_hash, chain_id)
+VALUES ($1, $2, $3)
+RETURNING *;
\ No newline at end of file
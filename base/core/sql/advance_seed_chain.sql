@@ -0,0 +1,6 @@
+-- $1 = id
+
+UPDATE seed_chains
+SET revealed = revealed + 1
+WHERE id = $1 AND revealed < length
+RETURNING revealed;
\ No newline at end of file
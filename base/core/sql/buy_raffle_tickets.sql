@@ -0,0 +1,34 @@
+-- $1 = raffle id
+-- $2 = user_id
+-- $3 = tickets
+
+-- Locking the raffle makes purchases wait for each other, and every step after it only happens if the one before did,
+-- so the buyer either pays and gets their tickets or nothing changes at all.
+WITH raffle AS (
+    SELECT id, price
+    FROM raffles
+    WHERE id = $1 AND ended_at IS NULL AND sold + $3 <= tickets
+    FOR UPDATE
+), debited AS (
+    UPDATE currency
+    SET tokens = tokens - raffle.price * $3
+    FROM raffle
+    WHERE user_id = $2 AND tokens >= raffle.price * $3
+    RETURNING currency.*
+), sold AS (
+    UPDATE raffles
+    SET sold = sold + $3
+    FROM debited
+    WHERE raffles.id = $1
+    RETURNING raffles.sold
+), entry AS (
+    INSERT INTO raffle_entries (raffle_id, user_id, tickets)
+    SELECT $1, user_id, $3 FROM debited
+    ON CONFLICT (raffle_id, user_id)
+    DO
+        UPDATE
+            SET tickets = raffle_entries.tickets + excluded.tickets
+    RETURNING id AS entry_id, tickets AS entry_tickets
+)
+SELECT debited.*, sold.sold, entry.entry_id, entry.entry_tickets
+FROM debited, sold, entry;
\ No newline at end of file
@@ -6,4 +6,5 @@ VALUES ($1, 0, $2)
 ON CONFLICT (user_id)
 DO
     UPDATE
-        SET seed = excluded.seed;
\ No newline at end of file
+        SET seed = excluded.seed
+RETURNING *;
\ No newline at end of file
@@ -6,4 +6,5 @@ VALUES ($1, $2)
 ON CONFLICT (user_id)
 DO
     UPDATE
-        SET tokens = currency.tokens + excluded.tokens;
\ No newline at end of file
+        SET tokens = currency.tokens + excluded.tokens
+RETURNING *;
\ No newline at end of file
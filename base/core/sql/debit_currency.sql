@@ -3,4 +3,5 @@
 
 UPDATE currency
 SET tokens = tokens - $2
-WHERE user_id = $1;
\ No newline at end of file
+WHERE user_id = $1 AND tokens >= $2
+RETURNING *;
\ No newline at end of file
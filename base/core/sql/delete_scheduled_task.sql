@@ -0,0 +1,3 @@
+-- $1 = id
+
+DELETE FROM scheduled_tasks WHERE id = $1;
\ No newline at end of file
@@ -0,0 +1,24 @@
+-- $1 = raffle id
+-- $2 = winner user_id
+-- $3 = winning ticket
+-- $4 = payout
+-- $5 = house user_id
+-- $6 = commission
+-- $7 = server seed id the raffle was drawn with
+
+-- Ends the raffle and pays the winner and the house together, so a raffle is never ended without being paid out.
+WITH ended AS (
+    UPDATE raffles
+    SET ended_at = NOW(), winner_id = $2, winning_ticket = $3, server_seed_id = $7
+    WHERE id = $1 AND ended_at IS NULL
+    RETURNING id
+)
+INSERT INTO currency (user_id, tokens)
+SELECT user_id, SUM(tokens)
+FROM unnest(ARRAY[$2::BIGINT, $5::BIGINT], ARRAY[$4::BIGINT, $6::BIGINT]) AS payouts (user_id, tokens), ended
+GROUP BY user_id
+ON CONFLICT (user_id)
+DO
+    UPDATE
+        SET tokens = currency.tokens + excluded.tokens
+RETURNING *;
\ No newline at end of file
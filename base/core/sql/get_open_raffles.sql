@@ -0,0 +1,6 @@
+-- Raffles made before they were tied to a server seed have no seed, and are drawn with the current one.
+SELECT raffles.*, server_seeds.seed, server_seeds.seed_hash
+FROM raffles
+LEFT JOIN server_seeds ON server_seeds.id = raffles.server_seed_id
+WHERE raffles.ended_at IS NULL
+ORDER BY raffles.id;
\ No newline at end of file
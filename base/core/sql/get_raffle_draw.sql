@@ -0,0 +1,13 @@
+-- $1 = number
+
+-- The latest ended raffle with this number. Its server seed is only returned once it has been revealed, which is once
+-- a newer seed has replaced it.
+SELECT
+    raffles.*,
+    server_seeds.seed_hash,
+    CASE WHEN server_seeds.id < (SELECT MAX(id) FROM server_seeds) THEN server_seeds.seed END AS seed
+FROM raffles
+JOIN server_seeds ON server_seeds.id = raffles.server_seed_id
+WHERE raffles.number = $1 AND raffles.ended_at IS NOT NULL
+ORDER BY raffles.id DESC
+LIMIT 1;
\ No newline at end of file
@@ -0,0 +1,3 @@
+-- $1 = raffle id
+
+SELECT id, user_id, tickets FROM raffle_entries WHERE raffle_id = $1 ORDER BY id;
\ No newline at end of file
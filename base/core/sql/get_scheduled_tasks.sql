@@ -0,0 +1 @@
+SELECT id, run_at, action, payload::TEXT FROM scheduled_tasks ORDER BY run_at;
\ No newline at end of file
@@ -0,0 +1 @@
+SELECT * FROM seed_chains ORDER BY id DESC LIMIT 1;
\ No newline at end of file
@@ -0,0 +1,4 @@
+SELECT *, EXTRACT(EPOCH FROM NOW() - created_at)::FLOAT AS age
+FROM server_seeds
+ORDER BY id DESC
+LIMIT 1;
\ No newline at end of file
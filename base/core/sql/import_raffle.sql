@@ -0,0 +1,19 @@
+-- $1 = number
+-- $2 = price
+-- $3 = tickets
+-- $4 = buyers' user_ids, in the order they first bought tickets
+-- $5 = tickets each buyer holds
+
+-- Brings over an open raffle from raffles.json, where raffles were kept before Postgres. Its tickets were paid for when
+-- they were bought, so nobody is charged. Importing the same raffle again does nothing.
+WITH raffle AS (
+    INSERT INTO raffles (number, price, tickets, sold)
+    SELECT $1, $2, $3, COALESCE(SUM(held), 0)
+    FROM unnest($5::INTEGER[]) AS held
+    ON CONFLICT (number) WHERE ended_at IS NULL DO NOTHING
+    RETURNING id
+)
+INSERT INTO raffle_entries (raffle_id, user_id, tickets)
+SELECT raffle.id, buyers.user_id, buyers.tickets
+FROM raffle, unnest($4::BIGINT[], $5::INTEGER[]) WITH ORDINALITY AS buyers (user_id, tickets, position)
+ORDER BY buyers.position;
\ No newline at end of file
@@ -0,0 +1,11 @@
+-- $1 = server_seed_id
+-- $2 = user_id
+-- $3 = block_size
+
+INSERT INTO nonces (server_seed_id, user_id, nonce_lease)
+VALUES ($1, $2, $3)
+ON CONFLICT (server_seed_id, user_id)
+DO
+    UPDATE
+        SET nonce_lease = nonces.nonce_lease + excluded.nonce_lease
+RETURNING nonce_lease;
\ No newline at end of file
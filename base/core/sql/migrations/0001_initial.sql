@@ -0,0 +1,72 @@
+CREATE TABLE IF NOT EXISTS currency (
+    user_id     BIGINT          PRIMARY KEY,
+    tokens      BIGINT          NOT NULL DEFAULT 0 CHECK (tokens >= 0),
+    seed        VARCHAR(128)    NOT NULL DEFAULT 'default'
+);
+
+-- Lets every process drop cached balances when a row changes, including edits made by hand.
+CREATE OR REPLACE FUNCTION notify_currency_change() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('currency', OLD.user_id::TEXT);
+    ELSE
+        PERFORM pg_notify('currency', NEW.user_id || ':' || NEW.tokens || ':' || NEW.seed);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS currency_changed ON currency;
+CREATE TRIGGER currency_changed
+    AFTER INSERT OR UPDATE OR DELETE ON currency
+    FOR EACH ROW EXECUTE PROCEDURE notify_currency_change();
+
+CREATE TABLE IF NOT EXISTS seed_chains (
+    id          SERIAL          PRIMARY KEY,
+    master_seed CHAR(64)        NOT NULL,
+    length      INTEGER         NOT NULL CHECK (length > 0),
+    tip         CHAR(64)        NOT NULL,
+    -- Seeds are revealed from the tip backwards; this many have been handed out so far.
+    revealed    INTEGER         NOT NULL DEFAULT 0 CHECK (revealed <= length),
+    created_at  TIMESTAMPTZ     NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS server_seeds (
+    id          SERIAL          PRIMARY KEY,
+    seed        CHAR(64)        NOT NULL,
+    seed_hash   CHAR(64)        NOT NULL,
+    chain_id    INTEGER         REFERENCES seed_chains (id),
+    created_at  TIMESTAMPTZ     NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS nonces (
+    server_seed_id  INTEGER     NOT NULL REFERENCES server_seeds (id),
+    user_id         BIGINT      NOT NULL,
+    -- Every nonce below this has been handed out to a process for this user and seed.
+    nonce_lease     BIGINT      NOT NULL DEFAULT 0 CHECK (nonce_lease >= 0),
+    PRIMARY KEY (server_seed_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS ledger (
+    id              BIGSERIAL       PRIMARY KEY,
+    user_id         BIGINT          NOT NULL,
+    game            VARCHAR(16)     NOT NULL,
+    amount          BIGINT          NOT NULL CHECK (amount >= 0),
+    direction       VARCHAR(6)      NOT NULL CHECK (direction IN ('debit', 'credit')),
+    -- The nonces rolled for the round this row belongs to, if any were.
+    server_seed_id  INTEGER         REFERENCES server_seeds (id),
+    nonce_start     BIGINT,
+    nonce_end       BIGINT,
+    created_at      TIMESTAMPTZ     NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION reject_ledger_change() RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'The ledger is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ledger_append_only ON ledger;
+CREATE TRIGGER ledger_append_only
+    BEFORE UPDATE OR DELETE ON ledger
+    FOR EACH ROW EXECUTE PROCEDURE reject_ledger_change();
\ No newline at end of file
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Built concurrently so adding it never blocks writes to a live ledger.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ledger_user_id_created_at_idx ON ledger (user_id, created_at);
\ No newline at end of file
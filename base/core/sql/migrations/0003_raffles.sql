@@ -0,0 +1,24 @@
+CREATE TABLE IF NOT EXISTS raffles (
+    id              SERIAL          PRIMARY KEY,
+    number          INTEGER         NOT NULL,
+    price           BIGINT          NOT NULL CHECK (price > 0),
+    tickets         INTEGER         NOT NULL CHECK (tickets > 0),
+    sold            INTEGER         NOT NULL DEFAULT 0 CHECK (sold <= tickets),
+    created_at      TIMESTAMPTZ     NOT NULL DEFAULT NOW(),
+    ended_at        TIMESTAMPTZ,
+    winner_id       BIGINT,
+    winning_ticket  INTEGER
+);
+
+-- Numbers are reused once a raffle has ended.
+CREATE UNIQUE INDEX IF NOT EXISTS raffles_open_number_idx ON raffles (number) WHERE ended_at IS NULL;
+
+-- One row per buyer. Tickets are numbered in order of each buyer's first purchase, so every buyer holds a contiguous
+-- range of them.
+CREATE TABLE IF NOT EXISTS raffle_entries (
+    id          BIGSERIAL       PRIMARY KEY,
+    raffle_id   INTEGER         NOT NULL REFERENCES raffles (id),
+    user_id     BIGINT          NOT NULL,
+    tickets     INTEGER         NOT NULL CHECK (tickets > 0),
+    UNIQUE (raffle_id, user_id)
+);
\ No newline at end of file
@@ -0,0 +1,2 @@
+-- The server seed each raffle was drawn with, so the draw can be checked once the seed is revealed.
+ALTER TABLE raffles ADD COLUMN IF NOT EXISTS server_seed_id INTEGER REFERENCES server_seeds (id);
\ No newline at end of file
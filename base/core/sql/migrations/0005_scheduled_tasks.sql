@@ -0,0 +1,7 @@
+-- Work the bot has put off until later, such as archiving a game room, so it still happens after a restart.
+CREATE TABLE IF NOT EXISTS scheduled_tasks (
+    id          BIGSERIAL       PRIMARY KEY,
+    run_at      TIMESTAMPTZ     NOT NULL,
+    action      TEXT            NOT NULL,
+    payload     JSONB           NOT NULL DEFAULT '{}'
+);
\ No newline at end of file
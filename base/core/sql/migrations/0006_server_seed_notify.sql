@@ -0,0 +1,12 @@
+-- Tells every process when a new server seed is activated, so they all roll with the same one.
+CREATE OR REPLACE FUNCTION notify_server_seed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('server_seeds', NEW.id::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS server_seed_added ON server_seeds;
+CREATE TRIGGER server_seed_added
+    AFTER INSERT ON server_seeds
+    FOR EACH ROW EXECUTE PROCEDURE notify_server_seed();
\ No newline at end of file
@@ -0,0 +1 @@
+SELECT pg_notify('rotate_seed', '');
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- $1 = user_ids
+-- $2 = tokens for each user_id
+
+INSERT INTO currency (user_id, tokens)
+SELECT user_id, SUM(tokens)
+FROM unnest($1::BIGINT[], $2::BIGINT[]) AS payouts (user_id, tokens)
+GROUP BY user_id
+ON CONFLICT (user_id)
+DO
+    UPDATE
+        SET tokens = currency.tokens + excluded.tokens
+RETURNING *;
\ No newline at end of file
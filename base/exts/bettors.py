@@ -1,21 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import asyncio
-import json
-import random
+import typing
 
-import aiofiles
-import asyncpg
 import discord
 from discord.ext import commands
 
 from base.core.base_cog import BaseCog
 from base.utils.embeds import Embed
+from base.utils.fenwick import FenwickTree
 from base.utils.game_utils import show_update
 from base.utils.premade_messages import not_enough_message
+from base.utils.provably_fair import draw_ticket
 
 
 class BettorCog(BaseCog):
+    def __init__(self, bot):
+        super().__init__(bot)
+        bot.scheduler.register("draw_raffle", self._draw_raffle)
+
+        self.bot.loop.create_task(self._schedule_missed_draws())
+
     @commands.command()
     async def setseed(self, ctx, *, seed):
         if seed:
@@ -35,9 +39,7 @@ class BettorCog(BaseCog):
                         description="A seed must not have mentions and must be shorter than 20 characters",
                     )
                 ).set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar_url)
-        await self.database.execute(
-            self.sql_cache.read("change_seed.sql"), ctx.author.id, seed
-        )
+        await self.balances.change_seed(ctx.author.id, seed)
         await ctx.send(
             embed=Embed(
                 title="Seed Successfully Updated",
@@ -48,9 +50,7 @@ class BettorCog(BaseCog):
     @commands.command()
     async def seed(self, ctx, member: discord.Member = None):
         member = ctx.author if member is None else member
-        mem_row = await self.database.fetchrow(
-            self.sql_cache.read("get_member.sql"), member.id
-        )
+        mem_row = await self.balances.get(member.id)
         await ctx.send(
             embed=Embed(
                 title="Seed",
@@ -67,11 +67,8 @@ class BettorCog(BaseCog):
                 description=(
                     "\n".join(
                         [
-                            f"Raffle {raffle}: {self.plur_simple(self.bot.raffles[raffle]['price'], 'token')} per "
-                            f"ticket, {len(self.bot.raffles[raffle]['members'])}/{self.bot.raffles[raffle]['tickets']} "
-                            f"tickets sold, "
-                            f"{round(self.bot.raffles[raffle]['price'] * self.bot.raffles[raffle]['tickets'] * .95)} "
-                            f"tokens payout!"
+                            f"Raffle {raffle.number}: {self.plur_simple(raffle.price, 'token')} per ticket, "
+                            f"{raffle.sold}/{raffle.tickets} tickets sold, {raffle.payout} tokens payout!"
                             for raffle in self.bot.raffles
                         ]
                         if self.bot.raffles
@@ -84,7 +81,7 @@ class BettorCog(BaseCog):
     @commands.command()
     async def buyticket(self, ctx, raffle_number):
         """Buy's a ticket from a raffle."""
-        if raffle_number not in self.bot.raffles:
+        if not raffle_number.isdigit() or int(raffle_number) not in self.bot.raffles:
             return await ctx.send(embed=Embed(title=f"A raffle with the number {raffle_number} could not be found!"))
         overwrites = {
             ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False),
@@ -96,142 +93,186 @@ class BettorCog(BaseCog):
             category=ctx.guild.get_channel(self.config.categories["game_room"]),
             overwrites=overwrites,
         )
-        raffle = self.bot.raffles[raffle_number]
+        raffle = self.bot.raffles[int(raffle_number)]
         await channel.send(
             f"{ctx.author.mention}, respond with the `!buy number of tickets` you would like to buy. Example:\n"
             f"```!buy 50```",
             embed=Embed(
                 title="Raffle Tickets Purchase",
-                description=f"Raffle {raffle_number}: {self.plur_simple(raffle['price'], 'token')} per ticket, "
-                f"{raffle['tickets'] - len(raffle['members'])} tickets remain, "
-                f"{round(raffle['price'] * raffle['tickets'] * .95)} tokens payout!",
+                description=f"Raffle {raffle_number}: {self.plur_simple(raffle.price, 'token')} per ticket, "
+                f"{raffle.remaining} tickets remain, {raffle.payout} tokens payout!",
             ),
         )
 
-        def check(m):
-            content = m.content.lower().split()
-            return (
-                len(content) == 2
-                and content[0] == "!buy"
-                and m.author.id == ctx.author.id
-                and m.channel.id == channel.id
-            )
-
-        message = (await self.bot.wait_for("message", check=check)).content.lower().split()[1]
+        command = await self.bot.router.wait_for(
+            channel.id, ctx.author.id, "!buy", check=lambda buy: len(buy.args) == 1
+        )
+        message = command.args[0]
         try:
             amount = await self.convert_to_tokens(ctx, message)
         except TypeError:
             await channel.send("The amount couldn't be parsed.  This channel will be auto archived in 15s.")
-            await asyncio.sleep(15)
-            return await channel.delete(reason="Channel auto-archived")
+            return await self._archive_later(channel, 15)
 
         await channel.send(
             embed=Embed(
                 title="Confirm",
-                description=f"This action will remove {amount * raffle['price']} tokens from your wallet. Type "
+                description=f"This action will remove {amount * raffle.price} tokens from your wallet. Type "
                 f"`!confirm` to confirm or `!cancel` to decline",
             )
         )
 
-        def check(m):
-            return (
-                m.content.lower() in ["!confirm", "!cancel"]
-                and m.author.id == ctx.author.id
-                and m.channel.id == channel.id
-            )
-
-        confirm = (await self.bot.wait_for("message", check=check)).content.lower() == "!confirm"
+        command = await self.bot.router.wait_for(channel.id, ctx.author.id, ["!confirm", "!cancel"])
+        confirm = command.verb == "!confirm"
         if not confirm:
             return await channel.delete(reason="Channel auto-archived")
 
-        if amount > raffle["tickets"] - len(raffle["members"]):
-            await channel.send(
-                "This channel will be auto archived in 15s.",
-                embed=Embed(description="There are not enough tickets to buy that many!"),
-            )
-            await asyncio.sleep(15)
-            return await channel.delete(reason="Channel auto-archived")
-
-        try:
-            await self.database.execute(
-                self.sql_cache.read("remove_currency.sql"), ctx.author.id, amount * raffle["price"]
-            )
-        except asyncpg.CheckViolationError:
-            await channel.send("This channel will be auto archived in 15s.", embed=not_enough_message(ctx))
-            await asyncio.sleep(15)
-            return await channel.delete(reason="Channel auto-archived")
+        mem_row = None
+        if 0 < amount <= raffle.remaining:
+            mem_row = await self.bot.raffles.buy(raffle, ctx.author.id, amount)
+        # Decided straight away, since other purchases can finish while we're sending messages below. Only the one that
+        # sold the last ticket draws the raffle.
+        sold_out = mem_row is not None and mem_row["sold"] == raffle.tickets
 
-        mem_row = await self.database.fetchrow(self.sql_cache.read("get_member.sql"), ctx.author.id)
         if mem_row is None:
-            await channel.send("This channel will be auto archived in 15s.", embed=not_enough_message(ctx))
-            await asyncio.sleep(15)
-            return await channel.delete(reason="Channel auto-archived")
+            if 0 < amount <= raffle.remaining:
+                embed = not_enough_message(ctx)
+            else:
+                embed = Embed(description="There are not enough tickets to buy that many!")
+            await channel.send("This channel will be auto archived in 15s.", embed=embed)
+            return await self._archive_later(channel, 15)
         await channel.send(
-            embed=Embed(description=f"{round(raffle['price'] * amount)} tokens have been removed from your balance.")
+            embed=Embed(description=f"{round(raffle.price * amount)} tokens have been removed from your balance.")
         )
-        await show_update(self, ctx.author, raffle["price"] * amount, mem_row)
+        await show_update(self, ctx.author, raffle.price * amount, mem_row)
 
         role = discord.utils.get(ctx.guild.roles, name=str(raffle_number))
         await ctx.author.add_roles(role)
 
-        for _ in range(amount):
-            self.bot.raffles[raffle_number]["members"].append(ctx.author.id)
-
-        if raffle["tickets"] <= len(raffle["members"]):
-            overwrites = {
-                ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                ctx.guild.get_role(self.config.roles["cashier"]): discord.PermissionOverwrite(
-                    read_messages=True, send_messages=False
-                ),
-                role: discord.PermissionOverwrite(read_messages=True, send_messages=False),
-            }
-            raffle_channel = await ctx.guild.create_text_channel(
-                name=f"raffle-{raffle_number}",
-                category=ctx.guild.get_channel(self.config.categories["game_room"]),
-                overwrites=overwrites,
+        if sold_out:
+            raffle_channel = await self._raffle_channel(ctx.guild, raffle.number, role)
+            # Drawn by a scheduled task, so the draw still happens if the bot restarts in the meantime.
+            await self.bot.scheduler.schedule(
+                30, "draw_raffle", {"raffle_id": raffle.id, "number": raffle.number, "channel_id": raffle_channel.id}
             )
             await raffle_channel.send(
                 ctx.guild.default_role,
                 embed=Embed(
-                    description=f"The raffle for {raffle_number} for {round(raffle['price'] * raffle['tickets'] * .95)}"
-                    f" will be rolled in 30 seconds!"
-                ),
-            )
-            await asyncio.sleep(30)
-            winner = ctx.guild.get_member(random.choice(raffle["members"]))
-            await raffle_channel.send(
-                winner.mention,
-                embed=Embed(
-                    title="Raffle Ended",
-                    description=f"The raffle has ended and {winner.mention} has won "
-                    f"{round(raffle['price'] * raffle['tickets'] * .95)}",
+                    description=f"The raffle for {raffle_number} for {raffle.payout} will be rolled in 30 seconds!"
                 ),
             )
-            winner_row = await self.database.fetchrow(self.sql_cache.read("get_member.sql"), winner.id)
-            await self.database.execute(
-                self.sql_cache.read("add_currency.sql"), winner.id, round(raffle["price"] * raffle["tickets"] * 0.95)
-            )
-            await show_update(self, winner, round(raffle["price"] * raffle["tickets"] * 0.95), winner_row, True)
-            self.bot.raffles.pop(str(raffle_number))
+
+        await self._archive_later(channel, 90)
+
+    async def _raffle_channel(
+        self, guild: discord.Guild, number: int, role: typing.Optional[discord.Role]
+    ) -> discord.TextChannel:
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.get_role(self.config.roles["cashier"]): discord.PermissionOverwrite(
+                read_messages=True, send_messages=False
+            ),
+        }
+        if role is not None:
+            overwrites[role] = discord.PermissionOverwrite(read_messages=True, send_messages=False)
+        return await guild.create_text_channel(
+            name=f"raffle-{number}",
+            category=guild.get_channel(self.config.categories["game_room"]),
+            overwrites=overwrites,
+        )
+
+    async def _draw_raffle(self, payload: dict) -> None:
+        """Draws a sold out raffle and announces its winner."""
+        # Numbers are reused once a raffle ends, and the task runs again if the bot stopped part way through it.
+        if payload["number"] not in self.bot.raffles or self.bot.raffles[payload["number"]].id != payload["raffle_id"]:
+            return
+
+        raffle = self.bot.raffles[payload["number"]]
+        try:
+            ticket, winner_id, rows = await self.bot.raffles.draw(raffle)
+        except ValueError:
+            self.logger.info("Raffle %s was already drawn", raffle.number)
+            return
+
+        guild = self.bot.get_channel(self.config.categories["game_room"]).guild
+        role = discord.utils.get(guild.roles, name=str(raffle.number))
+        raffle_channel = self.bot.get_channel(payload.get("channel_id"))
+        if raffle_channel is None:
+            raffle_channel = await self._raffle_channel(guild, raffle.number, role)
+
+        winner = guild.get_member(winner_id)
+        mention = winner.mention if winner is not None else f"<@{winner_id}>"
+        await raffle_channel.send(
+            mention,
+            embed=Embed(
+                title="Raffle Ended",
+                description=f"The raffle has ended and {mention} has won {raffle.payout} with ticket {ticket}",
+            ).set_footer(
+                text=f"Server seed hash: {raffle.seed_hash or self.bot.server_seed_hash} • Nonce: {raffle.id} • "
+                f"Check it with !verifyraffle {raffle.number}"
+            ),
+        )
+        if winner is not None:
+            await show_update(self, winner, raffle.payout, rows[winner_id], True)
+        if role is not None:
             await role.delete()
 
-            await self.database.execute(
-                self.sql_cache.read("add_currency.sql"), self.bot.user.id,
-                round(raffle["price"] * raffle["tickets"] * 0.05)
-            )
+    async def _schedule_missed_draws(self) -> None:
+        """Schedules draws for raffles that sold out just before a restart, before their draw was scheduled."""
+        scheduled = {payload["raffle_id"] for payload in self.bot.scheduler.pending("draw_raffle")}
+        for raffle in list(self.bot.raffles):
+            if not raffle.remaining and raffle.id not in scheduled:
+                self.logger.info("Raffle %s sold out without a draw scheduled, drawing it now", raffle.number)
+                await self.bot.scheduler.schedule(0, "draw_raffle", {"raffle_id": raffle.id, "number": raffle.number})
+
+    async def _archive_later(self, channel: discord.TextChannel, delay: float) -> None:
+        await self.bot.scheduler.schedule(
+            delay, "delete_channel", {"channel_id": channel.id, "reason": "Channel auto-archived"}
+        )
 
-        async with aiofiles.open("src/raffles.json", "w") as fp:
-            await fp.write(json.dumps(self.bot.raffles))
+    @commands.command()
+    async def verifyraffle(self, ctx, raffle_number: int):
+        """Shows how the winner of a raffle was drawn, so you can check it."""
+        row = await self.statements.fetchrow("get_raffle_draw", raffle_number)
+        if row is None:
+            return await ctx.send(embed=Embed(title=f"No ended raffle with the number {raffle_number} could be found!"))
+
+        entries = await self.statements.fetch("get_raffle_entries", row["id"])
+        index = FenwickTree(entry["tickets"] for entry in entries)
+        winner_range = index.range_of(index.find(row["winning_ticket"]))
+        winner = ctx.guild.get_member(row["winner_id"]) if ctx.guild else None
 
-        await asyncio.sleep(90)
-        await channel.delete(reason="Channel auto-archived")
+        embed = Embed(
+            title=f"Raffle {raffle_number}",
+            description=f"The winning ticket is `int(HMAC_SHA512(server_seed, \"raffle:{row['id']}\"), 16) % "
+            f"{row['sold']}`. Tickets are numbered from 0, in the order buyers first bought into the raffle.",
+        )
+        embed.add_field(name="Server Seed Hash", value=row["seed_hash"], inline=False)
+        embed.add_field(
+            name="Server Seed",
+            value=row["seed"] or "Not revealed yet, check back once the server seed has rotated",
+            inline=False,
+        )
+        embed.add_field(name="Nonce", value=row["id"])
+        embed.add_field(name="Tickets Sold", value=f"{row['sold']:,}")
+        embed.add_field(name="Winning Ticket", value=f"{row['winning_ticket']:,}")
+        embed.add_field(
+            name="Winner",
+            value=f"{winner.mention if winner else row['winner_id']}, "
+            f"holding tickets {winner_range[0]:,}-{winner_range[1] - 1:,}",
+            inline=False,
+        )
+        if row["seed"]:
+            fair = draw_ticket(row["seed"], row["id"], row["sold"]) == row["winning_ticket"]
+            embed.add_field(name="Verified", value="Yes" if fair else "No, the winning ticket doesn't match!")
+        await ctx.send(embed=embed)
 
     @commands.command(aliases=["w", "wallet", "bal"])
     async def balance(self, ctx, member: discord.Member = None):
         """Checks the balance of a member."""
         if not member:
             member = ctx.author
-        bal = await self.database.fetchrow(self.sql_cache.read("get_member.sql"), member.id)
+        bal = await self.balances.get(member.id)
         embed = Embed(title=f"Tokens", description=f"{bal['tokens'] if bal else 0:,}")
         embed.set_author(name=member.display_name, icon_url=member.avatar_url)
         await ctx.send(embed=embed)
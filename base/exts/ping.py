@@ -109,7 +109,10 @@ class PingPongCog(BaseCog):
 
         embed = Embed(title=pong_or_ping, description=pong)
         embed.set_author(name=ctx.bot.user.name, icon_url=ctx.bot.user.avatar_url)
-        embed.set_footer(text=f"{self.plur_simple(ctx.bot.command_invoke_count, 'command')} run since startup")
+        embed.set_footer(
+            text=f"{self.plur_simple(ctx.bot.command_invoke_count, 'command')} run since startup • "
+            f"{ctx.bot.balance.hit_rate:.1%} balance cache hit rate • {ctx.bot.log_sender.depth} log embeds queued"
+        )
         await msg.edit(content="", embed=embed)
 
 
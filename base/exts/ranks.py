@@ -37,9 +37,15 @@ class RanksCog(BaseCog):
         if amount <= 0:
             return
         if was_added:
-            await self.database.execute(self.sql_cache.read("add_currency.sql"), member.id, amount)
-        else:
-            await self.database.execute(self.sql_cache.read("remove_currency.sql"), member.id, amount)
+            await self.balances.credit(member.id, amount)
+        elif await self.balances.debit(member.id, amount) is None:
+            return await ctx.send(
+                embed=discord.Embed(
+                    title="Currency Error",
+                    description=f"{member.mention} doesn't have that many tokens!",
+                    color=0xFF0000,
+                )
+            )
         embed = discord.Embed(
             title="Update Success",
             description=f"{self.plur_simple(amount, 'token')} {'was' if amount == 1 else 'were'} successfully "
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import asyncio
+import functools
+import io
 import time
 import traceback
 from datetime import timedelta
@@ -9,13 +12,21 @@ import discord
 from discord.ext import commands
 
 from base.core import base_cog
+from base.core.rest import Priority
+from base.utils import simulator
+from base.utils.profiler import SamplingProfiler
 from base.utils.embeds import Embed
 from base.utils.utils import timedelta_str
 
 
+#: The longest !profile will sample for, in seconds.
+MAX_PROFILE_SECONDS = 300
+
+
 class SudoCog(base_cog.BaseCog):
     def __init__(self, bot):
         super().__init__(bot)
+        self.profiler = None
 
         self.bot.loop.create_task(self._edit_reboot_message())
 
@@ -88,6 +99,79 @@ class SudoCog(base_cog.BaseCog):
 
         await self.bot.logout()
 
+    @commands.command()
+    @commands.is_owner()
+    async def rotateseed(self, ctx):
+        """Reveals the current server seed and moves on to the next one"""
+        await self.bot.seeds.rotate()
+        await ctx.send("Rotating the server seed")
+
+    @commands.command()
+    @commands.is_owner()
+    async def simulate(self, ctx, game: str = None, rounds: int = 10_000_000):
+        """Simulates a game, or every game, to check its RTP and house edge"""
+        try:
+            variants = simulator.find_variants([game] if game else [])
+        except ValueError as ex:
+            return await ctx.send(str(ex))
+
+        flower_values = {name: flower.value for name, flower in self.config.flowers.items()}
+        pag = commands.Paginator()
+
+        async with ctx.typing():
+            for variant in variants:
+                # This takes a few seconds, so keep it off the event loop.
+                result = await self.bot.loop.run_in_executor(
+                    None, functools.partial(simulator.simulate, variant, rounds, flower_values=flower_values)
+                )
+                pag.add_line(str(result))
+
+        for page in pag.pages:
+            await ctx.send(page)
+
+    @commands.command()
+    @commands.is_owner()
+    async def profile(self, ctx, seconds: float = 10):
+        """Samples where the bot spends its CPU time for a number of seconds"""
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            return await ctx.send(f"Profile for between 0 and {MAX_PROFILE_SECONDS} seconds")
+        if self.profiler is not None and self.profiler.running:
+            return await ctx.send("A profile is already running")
+
+        self.profiler = profiler = SamplingProfiler()
+        async with ctx.typing():
+            profiler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.stop()
+
+        if not profiler.count:
+            return await ctx.send(f"No samples were taken in {seconds:g}s, the bot was idle")
+
+        pag = commands.Paginator()
+        interval = profiler.interval * 1_000
+        pag.add_line(f"{profiler.count:,} samples over {seconds:g}s, one per {interval:g}ms of CPU time")
+        pag.add_line()
+        pag.add_line("Functions by own samples (own, including callees):")
+        for name, own, total in profiler.top_functions():
+            pag.add_line(f"{own / profiler.count:7.2%} {total / profiler.count:7.2%}  {name}"[:1000])
+
+        pag.add_line()
+        pag.add_line("Top stacks, innermost frames last:")
+        for (root, *frames), samples in profiler.top_stacks():
+            pag.add_line(f"{samples / profiler.count:7.2%}  {root}"[:1000])
+            for frame in frames:
+                pag.add_line(f"           {frame}"[:1000])
+
+        for page in pag.pages:
+            await ctx.send(page)
+
+        await ctx.send(
+            "Collapsed stacks, for flamegraph.pl or speedscope:",
+            file=discord.File(io.BytesIO(profiler.collapsed().encode()), filename="profile.collapsed"),
+        )
+
     @commands.group()
     @commands.is_owner()
     async def db(self, ctx):
@@ -100,10 +184,56 @@ class SudoCog(base_cog.BaseCog):
         """Expire the connections to PostgreSQL and reacquire them"""
         async with ctx.typing():
             await self.database.expire_connections()
-            async with self.database.acquire() as conn:
+            async with self.statements.acquire() as conn:
                 await conn.fetch("SELECT 1")
         await ctx.send("Expired and created new connections")
 
+    @db.command()
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """Shows how busy the connection pool is"""
+        statements = self.statements
+        postgres = self.config.postgres
+        wait = statements.acquire_wait
+
+        pag = commands.Paginator()
+        pag.add_line(
+            f"Connections in use: {statements.in_use} (pool of {postgres.min_size}-{postgres.max_size}), "
+            f"{statements.in_flight - statements.in_use} waiting"
+        )
+        pag.add_line(
+            f"Acquire wait over {wait.count:,} acquires: mean {wait.mean * 1_000:.2f}ms, "
+            f"p99 <= {wait.quantile(0.99) * 1_000:g}ms, max {wait.max * 1_000:.2f}ms"
+        )
+        pag.add_line()
+        pag.add_line("Queries in flight when acquiring:")
+        for line in str(statements.in_flight_histogram).split("\n"):
+            pag.add_line(line)
+
+        pag.add_line()
+        pag.add_line("Statements by total time:")
+        timings = sorted(statements.timings.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, seconds) in timings[:10]:
+            pag.add_line(f"{name:<20} {calls:>9,} calls {seconds:9.2f}s {seconds / calls * 1_000:8.2f}ms avg")
+
+        for page in pag.pages:
+            await ctx.send(page)
+
+    @commands.command()
+    @commands.is_owner()
+    async def rest(self, ctx):
+        """Shows how long requests to Discord wait to be sent, by priority"""
+        pag = commands.Paginator()
+        for priority in Priority:
+            wait = self.bot.rest.waits[priority]
+            pag.add_line(
+                f"{priority.name.lower():<12} {self.bot.rest.depth(priority):>4} queued, {wait.count:>9,} sent, "
+                f"mean {wait.mean * 1_000:8.2f}ms, p99 <= {wait.quantile(0.99) * 1_000:g}ms, max {wait.max:.2f}s"
+            )
+
+        for page in pag.pages:
+            await ctx.send(page)
+
     @db.command()
     @commands.is_owner()
     async def do(self, ctx, *, query):
@@ -113,7 +243,7 @@ class SudoCog(base_cog.BaseCog):
 
         try:
             self.logger.warning("Interactive interpreter running %s", query)
-            async with self.database.acquire() as conn, ctx.typing():
+            async with self.statements.acquire() as conn, ctx.typing():
                 async with conn.transaction():
                     i = 1
                     async for record in conn.cursor(query):
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A Fenwick tree (binary indexed tree) of counts, for finding whose range a position falls in.
+
+Each item covers a contiguous range of positions, ``[prefix_sum(i), prefix_sum(i + 1))``, so a raffle with one item per
+buyer and their ticket count as its value maps a ticket number to its buyer in O(log buyers), without ever expanding
+the tickets themselves.
+"""
+import typing
+
+
+class FenwickTree:
+    def __init__(self, values: typing.Iterable[int] = ()):
+        self._values = list(values)
+        # 1-based; _tree[i] holds the sum of the (i & -i) values ending at value i - 1.
+        self._tree = [0, *self._values]
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int) -> int:
+        return self._values[index]
+
+    @property
+    def total(self) -> int:
+        return self.prefix_sum(len(self._values))
+
+    def append(self, value: int) -> None:
+        self._values.append(value)
+        i = len(self._values)
+        # The new node covers the (i & -i) values ending at it, all but the last of which are already in the tree.
+        lowest = i & -i
+        self._tree.append(value + self.prefix_sum(i - 1) - self.prefix_sum(i - lowest))
+
+    def add(self, index: int, delta: int) -> None:
+        self._values[index] += delta
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count: int) -> int:
+        """The sum of the first ``count`` values."""
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def range_of(self, index: int) -> typing.Tuple[int, int]:
+        """The positions covered by an item, as a half-open range."""
+        start = self.prefix_sum(index)
+        return start, start + self._values[index]
+
+    def find(self, position: int) -> int:
+        """The index of the item whose range covers ``position``."""
+        if not 0 <= position < self.total:
+            raise IndexError(f"Position {position} is outside of 0-{self.total - 1}")
+
+        index, step = 0, 1 << len(self._tree).bit_length()
+        while step:
+            if index + step < len(self._tree) and self._tree[index + step] <= position:
+                index += step
+                position -= self._tree[index]
+            step >>= 1
+        return index
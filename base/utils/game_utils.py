@@ -1,21 +1,43 @@
-import asyncio
+import itertools
 import random
+from collections import Counter
 
 import asyncpg
 import discord
 
 from base.utils.embeds import Embed
-from base.utils.premade_messages import not_enough_message
+from base.utils.premade_messages import no_seed_message, not_enough_message
+from base.utils.provably_fair import ROLL_VALUES
 
-__all__ = "send_to_history", "show_update", "game_check", "delete_room", "get_unique_number", "prov_fair_fp"
+__all__ = (
+    "send_to_history",
+    "show_update",
+    "game_check",
+    "delete_room",
+    "get_unique_number",
+    "prov_fair_fp",
+    "flower_hand_value",
+)
+
+#: Every flower, in the order their ranges of rolls come in.
+FLOWERS = ("red", "yellow", "orange", "rainbow", "blue", "purple", "pastel")
+
+#: Whether each flower is hot or cold. The hot flowers' rolls come before rainbow's, which is neither, and cold after.
+FLOWER_VALUES = {
+    flower: "hot" if index < FLOWERS.index("rainbow") else "cold" if index > FLOWERS.index("rainbow") else "none"
+    for index, flower in enumerate(FLOWERS)
+}
 
 
 async def send_to_history(self, author, row: asyncpg.Record, dice_roll: dict):
-    rolls_history = self.bot.get_channel(self.config.channels["rolls_history"])
-    await rolls_history.send(
-        embed=Embed(
+    await self.bot.log_sender.send(
+        self.config.channels["rolls_history"],
+        Embed(
             description=f"{author.mention} rolled **{'-'.join([str(dice) for dice in dice_roll['rolls']])}**"
-        ).set_footer(text=f"Seed: {row['seed']} • Nonce: {'-'.join([str(nonce) for nonce in dice_roll['nonces']])}")
+        ).set_footer(
+            text=f"User: {row['user_id']} • Seed: {row['seed']} • "
+            f"Nonce: {'-'.join([str(nonce) for nonce in dice_roll['nonces']])}"
+        ),
     )
 
 
@@ -26,8 +48,7 @@ async def show_update(self, author: discord.Member, amount: int, row: asyncpg.Re
     embed.add_field(name="New Balance", value=f"{row['tokens']:,}")
     embed.set_author(name=author.display_name, icon_url=author.avatar_url)
 
-    update_channel = self.bot.get_channel(self.config.channels["archive"])
-    await update_channel.send(embed=embed)
+    await self.bot.log_sender.send(self.config.channels["archive"], embed)
 
 
 async def game_check(self, ctx, amount) -> bool or (int, asyncpg.Record):
@@ -35,31 +56,31 @@ async def game_check(self, ctx, amount) -> bool or (int, asyncpg.Record):
     if amount <= 0:
         return -1
 
-    try:
-        await self.database.execute(self.sql_cache.read("remove_currency.sql"), ctx.author.id, amount)
-    except asyncpg.CheckViolationError:
-        await ctx.send(embed=not_enough_message(ctx))
+    # Until a server seed is active there is nothing to roll with, so don't take a stake we can't play.
+    if self.bot.nonces.seed_id is None:
+        self.bot.metrics.inc("games_refused_total", game=ctx.command.qualified_name)
+        await self.bot.rest.send(ctx, embed=no_seed_message(ctx))
         return -1
 
-    mem_row = await self.database.fetchrow(self.sql_cache.read("get_member.sql"), ctx.author.id)
+    self.bot.ledger.start_round(ctx.command.qualified_name)
+    mem_row = await self.balances.debit(ctx.author.id, amount)
     if mem_row is None:
-        await ctx.send(embed=not_enough_message(ctx))
+        await self.bot.rest.send(ctx, embed=not_enough_message(ctx))
         return -1
 
+    self.bot.metrics.inc("games_started_total", game=ctx.command.qualified_name)
     return amount, mem_row
 
 
 async def delete_room(self, channel):
-    await asyncio.sleep(120)
-    await channel.delete(reason="Game auto-archived")
-    self.bot.game_numbers.remove(int(channel.name))
+    await self.bot.rooms.release_after(channel, 120)
 
 
 def get_unique_number(self):
     return random.choice(list(set(range(1_000, 9_999)) - set(self.bot.game_numbers)))
 
 
-def prov_fair_fp(value: float) -> str:
+def _flower_of_roll(value: float) -> str:
     if 0.01 <= value <= 14.28:
         return "red"
     elif 14.29 <= value <= 28.57:
@@ -74,3 +95,43 @@ def prov_fair_fp(value: float) -> str:
         return "purple"
     else:
         return "pastel"
+
+
+def _hand_value(flowers) -> (int, str):
+    flowers = Counter(flowers).most_common()
+
+    if flowers[0][1] == 1:
+        return 0, "bust"
+    elif flowers[0][1] == 2:
+        return (1, "1 pair") if flowers[1][1] == 1 else (2, "2 pairs")
+    elif flowers[0][1] == 3:
+        return (3, "3 of a kind") if flowers[1][1] == 1 else (4, "full house")
+    elif flowers[0][1] == 4:
+        return 5, "4 of a kind"
+    elif flowers[0][1] == 5:
+        return 6, "5 of a kind"
+
+
+#: The flower for every roll ``roll_dice`` can produce, indexed by ``round(roll * 100) - 1``.
+FLOWER_OF_ROLL = tuple(_flower_of_roll(value) for value in ROLL_VALUES)
+
+#: The (rank, name) of every flower poker hand, indexed by the hand's flowers as a base 7 number. See ``hand_index``.
+HAND_VALUES = tuple(_hand_value(hand) for hand in itertools.product(range(len(FLOWERS)), repeat=5))
+
+_FLOWER_INDICES = {flower: index for index, flower in enumerate(FLOWERS)}
+
+
+def prov_fair_fp(value: float) -> str:
+    return FLOWER_OF_ROLL[round(value * 100) - 1]
+
+
+def hand_index(flowers: list) -> int:
+    index = 0
+    for flower in flowers:
+        index = index * len(FLOWERS) + _FLOWER_INDICES[flower]
+    return index
+
+
+def flower_hand_value(flowers: list) -> (int, str):
+    """The rank of a flower poker hand, for comparing it with another hand, and the name of the hand."""
+    return HAND_VALUES[hand_index(flowers)]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A fixed-bucket histogram, cheap enough to update on every query or event loop tick.
+"""
+import bisect
+import collections
+import typing
+
+
+class Histogram:
+    def __init__(self, bounds: typing.Sequence[float]):
+        # Each bucket counts values up to and including its bound; the last one counts everything above them all.
+        self.bounds = tuple(sorted(bounds))
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def reset(self) -> None:
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """The bound of the bucket holding the ``q`` quantile, or the largest value seen if it is above every bound."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def cumulative(self) -> typing.List[typing.Tuple[float, int]]:
+        """(bound, values up to and including it) for every bound, ending with infinity."""
+        pairs, seen = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.buckets):
+            seen += count
+            pairs.append((bound, seen))
+        return pairs
+
+    def __str__(self) -> str:
+        lines, lower = [], None
+        for bound, count in zip(self.bounds + (float("inf"),), self.buckets):
+            label = f"<= {bound:g}" if lower is None or bound != float("inf") else f"> {lower:g}"
+            share = count / self.count if self.count else 0.0
+            lines.append(f"{label:>10} {count:>9,} {share:7.2%}")
+            lower = bound
+        return "\n".join(lines)
+
+
+class RollingHistogram(Histogram):
+    """A histogram of only the last ``size`` values observed."""
+
+    def __init__(self, bounds: typing.Sequence[float], size: int):
+        super().__init__(bounds)
+        self.values = collections.deque(maxlen=size)
+
+    def observe(self, value: float) -> None:
+        if len(self.values) == self.values.maxlen:
+            oldest = self.values[0]
+            self.buckets[bisect.bisect_left(self.bounds, oldest)] -= 1
+            self.count -= 1
+            self.sum -= oldest
+
+        self.values.append(value)
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.values)
+
+    def reset(self) -> None:
+        super().reset()
+        self.values.clear()
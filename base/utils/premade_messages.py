@@ -15,3 +15,25 @@ def not_enough_message(ctx) -> discord.Embed:
     )
     embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar_url)
     return embed
+
+
+def no_seed_message(ctx) -> discord.Embed:
+    embed = discord.Embed(
+        title="Starting Up",
+        description=f"Sorry {ctx.author.mention}, there's no server seed to roll with yet. Please try again in a moment, "
+        f"you haven't been charged.",
+        color=0xFFA500,
+    )
+    embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar_url)
+    return embed
+
+
+def overloaded_message(ctx) -> discord.Embed:
+    embed = discord.Embed(
+        title="Busy",
+        description=f"Sorry {ctx.author.mention}, we're very busy right now. Please try starting your game again in a "
+        f"minute, any games you're already playing aren't affected.",
+        color=0xFFA500,
+    )
+    embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar_url)
+    return embed
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A statistical profiler that is cheap enough to run on the live bot.
+
+While running, a SIGPROF interval timer interrupts the process every ``interval`` seconds of CPU time, and the handler
+records the stack it interrupted on the main thread, rooted at the asyncio task that was running, so samples from the
+event loop are grouped by coroutine as well as by function. Only CPU time is sampled, so time spent waiting on Discord
+or Postgres doesn't show up, which is what we want when the bot is slow because it's busy. Executor threads aren't
+sampled; their stacks look the same whether they're working or idle.
+
+Results come as the most common stacks and functions, or as collapsed stacks that ``flamegraph.pl`` or speedscope can
+draw.
+"""
+import asyncio
+import collections
+import signal
+import typing
+
+Stack = typing.Tuple[str, ...]
+
+#: Seconds of CPU time between samples.
+INTERVAL = 0.005
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def _stack(frame) -> typing.List[str]:
+    """A frame's stack, outermost first."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = INTERVAL):
+        self.interval = interval
+        self.samples: typing.Counter[Stack] = collections.Counter()
+        self.running = False
+        self._previous_handler = None
+
+    @property
+    def count(self) -> int:
+        return sum(self.samples.values())
+
+    def start(self) -> None:
+        """Starts sampling. Must be called from the main thread, like any signal handling."""
+        if self.running:
+            raise RuntimeError("The profiler is already running")
+
+        self.running = True
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        self.running = False
+
+    def _sample(self, _signum, frame) -> None:
+        # Signal handlers run on the main thread, on top of whatever frame they interrupted.
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        root = f"task:{task.get_coro().__qualname__}" if task is not None else "main"
+        self.samples[(root, *_stack(frame))] += 1
+
+    def top_stacks(self, count: int = 10, depth: int = 5) -> typing.List[typing.Tuple[Stack, int]]:
+        """The most sampled stacks, cut down to their innermost ``depth`` frames and the task they ran in."""
+        trimmed = collections.Counter()
+        for stack, samples in self.samples.items():
+            root, frames = stack[0], stack[1:]
+            trimmed[(root, *frames[-depth:])] += samples
+        return trimmed.most_common(count)
+
+    def top_functions(self, count: int = 10) -> typing.List[typing.Tuple[str, int, int]]:
+        """The functions most often sampled, as (name, samples in the function itself, samples in or under it)."""
+        own, total = collections.Counter(), collections.Counter()
+        for stack, samples in self.samples.items():
+            own[stack[-1]] += samples
+            for name in set(stack[1:]):
+                total[name] += samples
+        return [(name, samples, total[name]) for name, samples in own.most_common(count)]
+
+    def collapsed(self) -> str:
+        """Every sampled stack in the collapsed format flame graph tools read, one ``a;b;c count`` per line."""
+        return "\n".join(f"{';'.join(stack)} {samples}" for stack, samples in self.samples.most_common()) + "\n"
@@ -1,62 +1,88 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import asyncio
-import math
-import secrets
-
-import aiofiles
-import discord
-
-from base.utils.embeds import Embed
-
-__all__ = ("roll_dice", "update_seed", "roll")
-
+import functools
 import hashlib
 import hmac
+import math
 
-
-async def update_seed(bot):
-    await bot.wait_until_ready()
-
-    try:
-        async with aiofiles.open("SEEDS") as fp:
-            bot.server_seed, bot.server_seed_hash = (await fp.read()).strip().split("\n")
-
-    except (AttributeError, discord.NotFound, IndexError, FileNotFoundError):
-        bot.logger.error("No SEED file found... Generating a new seed!")
-
-    seeds = discord.utils.get(bot.get_all_channels(), name="seeds")
-
-    while not bot.is_closed():
-        old_hash = bot.server_seed_hash
-        old_server_seed = bot.server_seed
-        bot.server_seed = secrets.token_hex(32)
-        bot.server_seed_hash = str(hashlib.sha256(str(bot.server_seed).encode("utf-8")).hexdigest())
-        bot.nonce = 0
-
-        embed = Embed(
-            title="Provably Fair",
-            description=f"**Previous Hash:** {old_hash}\n"
-            f"**Previous Seed:** {old_server_seed}\n"
-            f"**Current Hash:** {bot.server_seed_hash}",
-        )
-        await seeds.send(embed=embed)
-
-        async with aiofiles.open("SEEDS", "w") as fp:
-            await fp.write(f"{bot.server_seed}\n{bot.server_seed_hash}")
-
-        await asyncio.sleep(12 * 60 * 60)
-
-
-def roll(self, seed, rolls: int = 1, out_of_six: bool = False) -> dict:
-    results = {"rolls": [], "nonces": []}
-    for _ in range(rolls):
-        if out_of_six:
-            results["rolls"].append(math.ceil(roll_dice(self.bot.server_seed, f"{seed}-{self.bot.nonce}") / (100 / 6)))
-        else:
-            results["rolls"].append(roll_dice(self.bot.server_seed, f"{seed}-{self.bot.nonce}"))
-        results["nonces"].append(self.bot.nonce)
-        self.bot.nonce += 1
+__all__ = (
+    "ROLL_VALUES",
+    "roll_dice",
+    "roll_message",
+    "roll_many",
+    "roll",
+    "draw_ticket",
+    "hash_seed",
+    "build_seed_chain",
+    "seed_chain_distance",
+)
+
+#: The HMAC-SHA512 digest is read as 25 windows of 5 hex characters (20 bits) each.
+_DIGEST_BITS = 512
+_WINDOW_BITS = 20
+_WINDOW_MASK = (1 << _WINDOW_BITS) - 1
+_WINDOWS = 25
+
+#: Every value ``lucky % 10_000`` can take, mapped to the roll ``roll_dice`` would produce for it.
+ROLL_VALUES = tuple(round(lucky / 100 + 0.01, 2) for lucky in range(10_000))
+
+#: What ``roll_dice`` falls back to if every window of the digest is rejected.
+_EXHAUSTED_ROLL = round(99.99 % 10_000 / 100 + 0.01, 2)
+
+
+async def roll(self, row, rolls: int = 1, out_of_six: bool = False) -> dict:
+    """Rolls for a member's currency row, using their client seed and their own stream of nonces."""
+    server_seed, nonce_start = await self.bot.nonces.take(row["user_id"], rolls)
+    self.bot.ledger.rolled(row["user_id"], self.bot.nonces.seed_id, nonce_start, nonce_start + rolls - 1)
+
+    results = roll_many(server_seed, row["user_id"], row["seed"], nonce_start, rolls)
+    if out_of_six:
+        results = [math.ceil(result / (100 / 6)) for result in results]
+
+    return {"rolls": results, "nonces": list(range(nonce_start, nonce_start + rolls))}
+
+
+@functools.lru_cache(maxsize=8)
+def _keyed_state(server_seed):
+    """Keys HMAC-SHA512 with the server seed once; every roll under that seed copies this state."""
+    return hmac.new(bytes(str(server_seed), "ascii"), digestmod=hashlib.sha512)
+
+
+def _lucky_roll(digest: bytes) -> float:
+    """Same window walk as ``roll_dice``, but reading the raw digest bytes instead of its hexdigest."""
+    value = int.from_bytes(digest, "big")
+    for index in range(_WINDOWS):
+        lucky = (value >> (_DIGEST_BITS - _WINDOW_BITS * (index + 1))) & _WINDOW_MASK
+        if lucky < 999_999:
+            return ROLL_VALUES[lucky % 10_000]
+    return _EXHAUSTED_ROLL
+
+
+def roll_message(user_id: int, client_seed, nonce: int) -> str:
+    """
+    The message hashed for a user's roll.
+
+    Every user's nonces start from 0 under each server seed, and many share a client seed, so the user is part of the
+    message. Otherwise everyone on the same client seed would roll the same sequence, and could watch somebody else's
+    rolls to see their own next ones.
+    """
+    return f"{user_id}:{client_seed}-{nonce}"
+
+
+def roll_many(server_seed, user_id: int, client_seed, nonce_start: int, count: int) -> list:
+    """
+    Rolls ``count`` dice for a user's nonces ``nonce_start`` to ``nonce_start + count - 1``.
+
+    Each result is identical to ``roll_dice(server_seed, roll_message(user_id, client_seed, nonce))``.
+    """
+    state = _keyed_state(str(server_seed))
+    # roll_message(user_id, client_seed, nonce), without the string formatting for every nonce.
+    prefix = bytes(roll_message(user_id, client_seed, ""), "ascii")
+    results = []
+    for nonce in range(nonce_start, nonce_start + count):
+        hasher = state.copy()
+        hasher.update(b"%s%d" % (prefix, nonce))
+        results.append(_lucky_roll(hasher.digest()))
     return results
 
 
@@ -73,3 +99,44 @@ def roll_dice(server_seed, client_seed):
     lucky %= 10_000
     lucky /= 100
     return round(lucky + 0.01, 2)
+
+
+def draw_ticket(server_seed, raffle_nonce: int, tickets: int) -> int:
+    """
+    The winning ticket, from 0 to ``tickets - 1``, of the raffle with the public nonce ``raffle_nonce``.
+
+    Like every roll, this is HMAC-SHA512 keyed with the server seed, but over ``raffle:<nonce>``. Roll messages always
+    start with a user id, so no client seed can produce the same message. The whole digest is read as one number and
+    taken modulo the tickets sold, which is biased by less than 2^-480 for any raffle that fits in Postgres.
+    """
+    hasher = _keyed_state(str(server_seed)).copy()
+    hasher.update(bytes(f"raffle:{raffle_nonce}", "ascii"))
+    return int.from_bytes(hasher.digest(), "big") % tickets
+
+
+def hash_seed(server_seed) -> str:
+    """The hash published for a server seed before it is revealed."""
+    return hashlib.sha256(str(server_seed).encode("utf-8")).hexdigest()
+
+
+def build_seed_chain(master_seed: str, length: int) -> list:
+    """
+    Hashes ``master_seed`` ``length`` times, returning every link with the master seed first and the tip last.
+
+    Seeds are revealed from the tip backwards, so every seed hashes to the one revealed before it and the first one
+    hashes to the tip, which is published when the chain is made.
+    """
+    chain = [master_seed]
+    for _ in range(length):
+        chain.append(hash_seed(chain[-1]))
+    return chain
+
+
+def seed_chain_distance(server_seed, tip: str, max_distance: int):
+    """How many times ``server_seed`` has to be hashed to reach ``tip``, or None if it takes more than max_distance."""
+    link = str(server_seed)
+    for distance in range(1, max_distance + 1):
+        link = hash_seed(link)
+        if link == tip:
+            return distance
+    return None
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo simulation of every game's rules, to check the return to player of a payout before shipping it.
+
+Rounds are simulated in NumPy in bulk, drawing rolls from exactly the distribution ``roll_dice`` produces: a uniform
+value below 999,999 taken modulo 10,000.
+"""
+import argparse
+import dataclasses
+import time
+import typing
+
+import numpy as np
+
+from base.utils.game_utils import FLOWER_OF_ROLL, FLOWER_VALUES, FLOWERS, HAND_VALUES
+from base.utils.provably_fair import ROLL_VALUES
+
+#: Rounds simulated per batch, which bounds memory use to a few hundred MB.
+CHUNK_SIZE = 1_000_000
+
+_ROLLS = np.array(ROLL_VALUES)
+_DICE = np.ceil(_ROLLS / (100 / 6)).astype(np.int8)
+_FLOWER_OF_ROLL = np.array([FLOWERS.index(flower) for flower in FLOWER_OF_ROLL], dtype=np.int64)
+_HAND_RANKS = np.array([rank for rank, _ in HAND_VALUES], dtype=np.int8)
+# Turns a row of five flower indices into its index in HAND_VALUES.
+_HAND_PLACES = len(FLOWERS) ** np.arange(4, -1, -1)
+
+
+@dataclasses.dataclass(frozen=True)
+class Variant:
+    game: str
+    choice: typing.Optional[str]
+    # Multiple of the bet paid back to a winning bettor, before commission.
+    payout: float
+    # Share of the winnings the house keeps as commission.
+    commission: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.game if self.choice is None else f"{self.game} {self.choice}"
+
+    @property
+    def paid(self) -> float:
+        """Multiple of the bet a winning bettor actually gets, after commission."""
+        return self.payout * (1 - self.commission)
+
+
+@dataclasses.dataclass(frozen=True)
+class Result:
+    variant: Variant
+    rounds: int
+    win_rate: float
+    seconds: float
+
+    @property
+    def rtp(self) -> float:
+        """Expected tokens paid back per token bet, after commission."""
+        return self.variant.paid * self.win_rate
+
+    @property
+    def take(self) -> float:
+        """Expected commission per token bet, which is part of the house edge."""
+        return self.variant.payout * self.variant.commission * self.win_rate
+
+    @property
+    def variance(self) -> float:
+        """Variance of the tokens paid back per token bet in a single round."""
+        return self.variant.paid**2 * self.win_rate * (1 - self.win_rate)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.variant.name:<14} {self.variant.paid:>5.2f}x  RTP {self.rtp:7.2%}  edge {1 - self.rtp:7.2%}  "
+            f"commission {self.take:6.2%}  var {self.variance:6.3f}"
+        )
+
+
+#: The rules as they are implemented in HouseCog and PlayerCog.
+VARIANTS = (
+    Variant("54x2", None, 2.0),
+    *(Variant("ou", choice, 2.0) for choice in ("over", "under")),
+    Variant("ou", "7", 5.0),
+    *(Variant("hc", choice, 2.0) for choice in ("hot", "cold")),
+    *(Variant("hc", flower, 5.0) for flower in FLOWERS),
+    Variant("fp", None, 2.0, 0.1),
+    Variant("dd", None, 2.0, 0.1),
+    Variant("bj", None, 2.0),
+    # The winner takes both bets, less a tenth of one of them.
+    Variant("open-fp", None, 2.0, 0.05),
+    Variant("open-dd", None, 2.0, 0.05),
+)
+
+
+def _rolls(rng, shape) -> np.ndarray:
+    """Indices into ``ROLL_VALUES``, distributed like ``roll_dice``."""
+    return rng.integers(0, 999_999, size=shape) % 10_000
+
+
+def _flower_poker_ranks(rng, rounds: int) -> np.ndarray:
+    return _HAND_RANKS[_FLOWER_OF_ROLL[_rolls(rng, (rounds, 5))] @ _HAND_PLACES]
+
+
+def _dice_duel_sums(rng, rounds: int) -> np.ndarray:
+    return _DICE[_rolls(rng, (rounds, 2))].sum(axis=1)
+
+
+def _until_decided(rng, rounds: int, score) -> np.ndarray:
+    """Plays head to head rounds, replaying ties like the cogs do, and returns whether the bettor won each."""
+    wins = np.empty(rounds, dtype=bool)
+    pending = np.arange(rounds)
+    while pending.size:
+        bettor, opponent = score(rng, pending.size), score(rng, pending.size)
+        decided = bettor != opponent
+        wins[pending[decided]] = bettor[decided] > opponent[decided]
+        pending = pending[~decided]
+    return wins
+
+
+def _blackjack(rng, rounds: int, stand_at: float) -> np.ndarray:
+    bettor = _ROLLS[_rolls(rng, rounds)]
+    hitting = bettor < stand_at
+    while hitting.any():
+        bettor[hitting] += _ROLLS[_rolls(rng, hitting.sum())]
+        hitting &= bettor < stand_at
+
+    house = _ROLLS[_rolls(rng, rounds)]
+    drawing = (bettor <= 100) & (house < bettor) & (house < 100)
+    while drawing.any():
+        house[drawing] += _ROLLS[_rolls(rng, drawing.sum())]
+        drawing &= (house < bettor) & (house < 100)
+
+    return (bettor <= 100) & ((house < bettor) | (house > 100))
+
+
+def _play(variant: Variant, rng, rounds: int, flower_values: dict, stand_at: float) -> np.ndarray:
+    """Whether the bettor won each of ``rounds`` rounds."""
+    if variant.game == "54x2":
+        return _ROLLS[_rolls(rng, rounds)] >= 54
+    elif variant.game == "ou":
+        sums = _dice_duel_sums(rng, rounds)
+        return {"over": sums > 7, "under": sums < 7, "7": sums == 7}[variant.choice]
+    elif variant.game == "hc":
+        flowers = _FLOWER_OF_ROLL[_rolls(rng, rounds)]
+        if variant.choice in FLOWERS:
+            return flowers == FLOWERS.index(variant.choice)
+        winning = [i for i, flower in enumerate(FLOWERS) if flower_values[flower] == variant.choice]
+        return np.isin(flowers, winning)
+    elif variant.game in ("fp", "open-fp"):
+        return _until_decided(rng, rounds, _flower_poker_ranks)
+    elif variant.game in ("dd", "open-dd"):
+        return _until_decided(rng, rounds, _dice_duel_sums)
+    elif variant.game == "bj":
+        return _blackjack(rng, rounds, stand_at)
+    else:
+        raise ValueError(f"Unknown game {variant.game}")
+
+
+def simulate(
+    variant: Variant, rounds: int, seed: int = None, flower_values: dict = None, stand_at: float = 60.0
+) -> Result:
+    """
+    Simulates ``rounds`` rounds of a game.
+
+    Blackjack bettors are assumed to hit until they reach ``stand_at``.
+    """
+    rng = np.random.default_rng(seed)
+    flower_values = flower_values or FLOWER_VALUES
+    start = time.perf_counter()
+
+    wins = 0
+    for chunk_start in range(0, rounds, CHUNK_SIZE):
+        wins += int(_play(variant, rng, min(CHUNK_SIZE, rounds - chunk_start), flower_values, stand_at).sum())
+
+    return Result(variant, rounds, wins / rounds, time.perf_counter() - start)
+
+
+def find_variants(games: typing.Iterable[str] = ()) -> list:
+    """Every variant of the given games, or of every game if none are given."""
+    games = set(games)
+    unknown = games - {variant.game for variant in VARIANTS}
+    if unknown:
+        raise ValueError(f"Unknown games: {', '.join(sorted(unknown))}")
+    return [variant for variant in VARIANTS if not games or variant.game in games]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("games", nargs="*", help="games to simulate, such as dd or hc; every game by default")
+    parser.add_argument("--rounds", type=int, default=10_000_000, help="rounds to simulate for each game")
+    parser.add_argument("--seed", type=int, help="seed for the random number generator, for repeatable runs")
+    parser.add_argument("--payout", type=float, help="try a different payout, before commission, than the live one")
+    parser.add_argument("--commission", type=float, help="try a different share of winnings kept as commission")
+    parser.add_argument("--stand-at", type=float, default=60.0, help="total a blackjack bettor stands at")
+    parser.set_defaults(func=main)
+
+
+def main(args) -> int:
+    try:
+        variants = find_variants(args.games)
+    except ValueError as ex:
+        print(ex)
+        return 2
+
+    for variant in variants:
+        if args.payout is not None:
+            variant = dataclasses.replace(variant, payout=args.payout)
+        if args.commission is not None:
+            variant = dataclasses.replace(variant, commission=args.commission)
+
+        result = simulate(variant, args.rounds, args.seed, stand_at=args.stand_at)
+        print(f"{result}  ({result.rounds / result.seconds:,.0f} rounds/s)")
+
+    return 0
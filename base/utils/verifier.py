@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline bulk verification of provably fair rolls, spread across a process pool.
+
+Given a revealed server seed, a user, their client seed and a range of their nonces, every roll is recomputed and
+written out as ``nonce,roll``, to compare against the rolls_history channel or keep for later. Given a CSV file of
+``server_seed,user_id,client_seed,nonce,claimed_roll`` rows instead, only the rows whose claimed roll doesn't match
+are written out, and rows that can't be read are reported and skipped. A raffle's winning ticket can be recomputed from
+the revealed server seed, its nonce and the number of tickets sold.
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import itertools
+import os
+import sys
+import time
+
+from base.utils.provably_fair import draw_ticket, hash_seed, roll_many, seed_chain_distance
+
+#: Nonces or rows handed to a worker at a time. Large enough that pickling the results is cheap in comparison.
+CHUNK_SIZE = 50_000
+
+
+def _nonce_range(value: str) -> range:
+    try:
+        start, _, end = value.partition("-")
+        return range(int(start), int(end or start) + 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a nonce or a range of nonces like 0-999") from None
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--server-seed", help="the revealed server seed to recompute rolls with")
+    parser.add_argument("--server-seed-hash", help="the hash published for the server seed, checked before rolling")
+    parser.add_argument("--chain-tip", help="the published tip of the seed chain the server seed should belong to")
+    parser.add_argument("--chain-length", type=int, default=100_000, help="how far to walk the chain for the tip")
+    parser.add_argument("--user-id", type=int, help="the id of the user who rolled, shown in every roll's footer")
+    parser.add_argument("--client-seed", default="default", help="the client seed the rolls were made with")
+    parser.add_argument("--nonces", type=_nonce_range, help="a nonce, or an inclusive range of nonces like 0-999")
+    parser.add_argument(
+        "--file", type=argparse.FileType(), help="CSV of server_seed,user_id,client_seed,nonce,claimed_roll"
+    )
+    parser.add_argument("--raffle", type=int, metavar="NONCE", help="the nonce of a raffle to draw the winner of")
+    parser.add_argument("--tickets", type=int, help="the number of tickets sold in the raffle")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to verify with")
+    parser.set_defaults(func=main)
+
+
+def _check_rows(rows: list) -> (int, list, list):
+    """Checks ``(line number, row)`` pairs, returning how many were checked, the mismatches and the unreadable rows."""
+    mismatches, errors = [], []
+    for line, row in rows:
+        try:
+            server_seed, user_id, client_seed, nonce, claimed = row
+            actual = roll_many(server_seed, int(user_id), client_seed, int(nonce), 1)[0]
+            claimed_roll = float(claimed)
+        except ValueError as ex:
+            errors.append((line, str(ex)))
+            continue
+
+        if claimed_roll != actual:
+            mismatches.append((*row, actual))
+    return len(rows) - len(errors), mismatches, errors
+
+
+def _chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_ordered(executor, fn, jobs, max_in_flight: int):
+    """Submits ``fn(*job)`` for every job, yielding results in submission order with a bounded backlog."""
+    in_flight = collections.deque()
+    for job in jobs:
+        in_flight.append(executor.submit(fn, *job))
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def main(args) -> int:
+    if args.raffle is not None:
+        if args.server_seed is None or args.tickets is None or args.tickets <= 0:
+            print("--raffle needs --server-seed and the --tickets sold", file=sys.stderr)
+            return 2
+    elif args.file is None and (args.server_seed is None or args.user_id is None or args.nonces is None):
+        print("Either --file, --server-seed with --user-id and --nonces, or --raffle is required", file=sys.stderr)
+        return 2
+
+    if (args.server_seed_hash or args.chain_tip) and args.server_seed is None:
+        print("--server-seed-hash and --chain-tip need --server-seed to check against", file=sys.stderr)
+        return 2
+
+    if args.server_seed_hash is not None and hash_seed(args.server_seed) != args.server_seed_hash.lower():
+        print("The server seed does not match the published hash", file=sys.stderr)
+        return 1
+
+    if args.chain_tip is not None:
+        distance = seed_chain_distance(args.server_seed, args.chain_tip.lower(), args.chain_length)
+        if distance is None:
+            print("The server seed does not belong to the seed chain", file=sys.stderr)
+            return 1
+        print(f"The server seed is seed #{distance:,} of the seed chain", file=sys.stderr)
+
+    if args.raffle is not None:
+        ticket = draw_ticket(args.server_seed, args.raffle, args.tickets)
+        print(f"The winning ticket of raffle {args.raffle} is {ticket}")
+        return 0
+
+    writer = csv.writer(sys.stdout)
+    total = mismatches = errors = 0
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as executor:
+        if args.file is not None:
+            # Everything but the header, if there is one.
+            reader = csv.reader(args.file)
+            rows = ((reader.line_num, row) for row in reader if row and row[0] != "server_seed")
+            jobs = ((chunk,) for chunk in _chunked(rows, CHUNK_SIZE))
+
+            writer.writerow(("server_seed", "user_id", "client_seed", "nonce", "claimed_roll", "actual_roll"))
+            for checked, chunk_mismatches, chunk_errors in _run_ordered(executor, _check_rows, jobs, args.workers * 2):
+                writer.writerows(chunk_mismatches)
+                for line, error in chunk_errors:
+                    print(f"Skipping line {line}: {error}", file=sys.stderr)
+                total += checked
+                mismatches += len(chunk_mismatches)
+                errors += len(chunk_errors)
+        else:
+            nonces = args.nonces
+            chunk_starts = range(nonces.start, nonces.stop, CHUNK_SIZE)
+            jobs = (
+                (
+                    args.server_seed,
+                    args.user_id,
+                    args.client_seed,
+                    chunk_start,
+                    min(CHUNK_SIZE, nonces.stop - chunk_start),
+                )
+                for chunk_start in chunk_starts
+            )
+
+            writer.writerow(("nonce", "roll"))
+            for chunk_start, rolls in zip(chunk_starts, _run_ordered(executor, roll_many, jobs, args.workers * 2)):
+                writer.writerows(zip(itertools.count(chunk_start), rolls))
+            total = len(nonces)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Verified {total:,} rolls in {elapsed:.2f}s ({total / elapsed:,.0f} rolls/s), {mismatches:,} mismatches"
+        f"{f', {errors:,} unreadable rows' if errors else ''}",
+        file=sys.stderr,
+    )
+    return 1 if mismatches or errors else 0
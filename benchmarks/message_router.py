@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Messages dispatched per second with 1,000 games waiting on messages, through the ``Router`` against the list of
+predicates ``Bot.wait_for`` keeps, which every message is checked against.
+
+Every game waits for its player's ``!roll`` in its own room, over and over, while the rest of the server chats.
+
+Run from the root of the repository with ``python -m benchmarks.message_router [games] [rounds]``.
+"""
+import asyncio
+import sys
+import time
+import types
+
+from base.core.router import Router
+
+#: Messages that no game is waiting on, for every message a game is.
+CHATTER = 4
+
+
+class Predicates:
+    """How discord.py 1.2's ``Client.dispatch`` resolves ``wait_for``, minus the rest of the event machinery."""
+
+    def __init__(self):
+        self.listeners = []
+
+    async def wait_for(self, check):
+        future = asyncio.get_event_loop().create_future()
+        self.listeners.append((future, check))
+        return await future
+
+    def dispatch(self, message):
+        removed = []
+        for i, (future, condition) in enumerate(self.listeners):
+            if future.cancelled():
+                removed.append(i)
+                continue
+
+            if condition(message):
+                future.set_result(message)
+                removed.append(i)
+
+        for i in reversed(removed):
+            del self.listeners[i]
+
+
+def _message(channel_id: int, author_id: int, content: str):
+    return types.SimpleNamespace(
+        channel=types.SimpleNamespace(id=channel_id), author=types.SimpleNamespace(id=author_id), content=content
+    )
+
+
+async def _play(wait, game: int, rounds: int):
+    for _ in range(rounds):
+        await wait(game)
+
+
+async def _run(name: str, dispatch, wait, games: int, rounds: int) -> float:
+    tasks = [asyncio.ensure_future(_play(wait, game, rounds)) for game in range(games)]
+    chatter = [_message(-1, -1, "anyone up for a game?") for _ in range(CHATTER)]
+    moves = [_message(game, game, "!roll") for game in range(games)]
+    dispatched, elapsed = 0, 0.0
+
+    for _ in range(rounds):
+        # Let every game start waiting before its player moves.
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        for move in moves:
+            for message in chatter:
+                dispatch(message)
+            dispatch(move)
+        elapsed += time.perf_counter() - start
+        dispatched += len(moves) * (CHATTER + 1)
+
+    await asyncio.gather(*tasks)
+    rate = dispatched / elapsed
+    print(f"{name:<12} {rate:>12,.0f} messages/s ({elapsed / dispatched * 1_000_000:.2f}us per message)")
+    return rate
+
+
+async def main(games: int = 1_000, rounds: int = 20):
+    print(f"{games:,} games, {rounds} moves each, {CHATTER} unrelated messages per move")
+
+    predicates = Predicates()
+
+    def wait_predicates(game):
+        return predicates.wait_for(
+            lambda m: m.author.id == game and m.channel.id == game and m.content.lower() == "!roll"
+        )
+
+    before = await _run("wait_for", predicates.dispatch, wait_predicates, games, rounds)
+
+    router = Router()
+    after = await _run("Router", router.dispatch, lambda game: router.wait_for(game, game, "!roll"), games, rounds)
+    assert len(router) == 0, "waiters were left behind"
+
+    print(f"{after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main(*map(int, sys.argv[1:])))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rolls per second of the one-at-a-time ``roll_dice`` against the batched ``roll_many``.
+
+Run from the root of the repository with ``python -m benchmarks.roll_throughput [rolls]``.
+"""
+import secrets
+import sys
+import time
+
+from base.utils.provably_fair import roll_dice, roll_many, roll_message
+
+
+def _rate(fn, rolls: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return rolls / (time.perf_counter() - start)
+
+
+def main(rolls: int = 200_000):
+    server_seed = secrets.token_hex(32)
+    user_id, client_seed = 123456789012345678, "default"
+
+    expected = [roll_dice(server_seed, roll_message(user_id, client_seed, nonce)) for nonce in range(1_000)]
+    assert roll_many(server_seed, user_id, client_seed, 0, 1_000) == expected, "roll_many diverged from roll_dice"
+
+    before = _rate(
+        lambda: [roll_dice(server_seed, roll_message(user_id, client_seed, nonce)) for nonce in range(rolls)], rolls
+    )
+    after = _rate(lambda: roll_many(server_seed, user_id, client_seed, 0, rolls), rolls)
+
+    # Flower poker asks for five rolls per call, so measure the per-game batch size too.
+    games = rolls // 5
+    per_game = _rate(
+        lambda: [roll_many(server_seed, user_id, client_seed, game * 5, 5) for game in range(games)], games * 5
+    )
+
+    print(f"roll_dice:          {before:>12,.0f} rolls/s")
+    print(f"roll_many:          {after:>12,.0f} rolls/s ({after / before:.2f}x)")
+    print(f"roll_many (5/call): {per_game:>12,.0f} rolls/s ({per_game / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))